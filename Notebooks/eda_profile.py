@@ -0,0 +1,136 @@
+"""
+Data-access and profiling helpers for the EDA notebook.
+- Loads each table from MySQL once, in chunks and with compact dtypes
+  (frame_loader.read_frame)
+- Caches the frame on local disk (Parquet, or pickle without pyarrow),
+  keyed by the ingestion version so a new load invalidates it
+- Computes every profile statistic (shape, dtypes, memory, nulls, duplicates,
+  unique counts, describe) from one factorisation pass per column
+
+Usage in the notebook:
+    from eda_profile import load_table, profile_all
+    profiles = profile_all(conn, tables)
+    profiles["map_users"]["nulls"]
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ingest_common and frame_loader live next to the loader scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from ingest_common import ingestion_version
+from frame_loader import read_frame
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+TABLES = [
+    "aggregated_users", "aggregated_transactions", "aggregated_insurances",
+    "map_users", "map_transactions", "map_insurances",
+    "top_users", "top_transactions", "top_insurances",
+]
+
+# ==============================================================================
+# LOCAL CACHE
+# ==============================================================================
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def cache_path(table, version):
+    ext = "parquet" if _has_pyarrow() else "pkl"
+    return os.path.join(CACHE_DIR, f"{table}-{version}.{ext}")
+
+
+def _write_cache(df, path, table):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Drop copies of this table from older ingestion versions
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(f"{table}-"):
+            os.remove(os.path.join(CACHE_DIR, name))
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_pickle(path)
+
+
+def _read_cache(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+_memory = {}  # (table, version) -> DataFrame, so repeated cells don't even touch disk
+
+
+def load_table(conn, table, version=None):
+    """Return the whole table as a compact DataFrame, from memory, disk cache or MySQL"""
+    if version is None:
+        cursor = conn.cursor()
+        version = ingestion_version(cursor)
+        cursor.close()
+
+    key = (table, version)
+    if key in _memory:
+        return _memory[key]
+
+    path = cache_path(table, version)
+    if os.path.exists(path):
+        df = _read_cache(path)
+    else:
+        df = read_frame(f"SELECT * FROM {table}", conn)
+        _write_cache(df, path, table)
+
+    _memory[key] = df
+    return df
+
+
+# ==============================================================================
+# PROFILING
+# ==============================================================================
+def profile_table(df):
+    """
+    All profile statistics of a frame. Each column is factorised once; the codes
+    give its null count and unique count, and together they give duplicate rows.
+    """
+    n_rows = len(df)
+    codes = np.empty((n_rows, len(df.columns)), dtype=np.int64)
+    nulls, nunique = {}, {}
+
+    for i, col in enumerate(df.columns):
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+        codes[:, i] = col_codes
+        nulls[col] = int((col_codes == -1).sum())
+        nunique[col] = len(uniques)
+
+    # Duplicate rows: identical code vectors (NaN codes as -1, so NaNs compare equal)
+    if n_rows:
+        _, first_index = np.unique(codes, axis=0, return_index=True)
+        duplicates = n_rows - len(first_index)
+    else:
+        duplicates = 0
+
+    return {
+        "shape": df.shape,
+        "columns": list(df.columns),
+        "dtypes": df.dtypes.astype(str).to_dict(),
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "non_null": {col: n_rows - nulls[col] for col in df.columns},
+        "nulls": nulls,
+        "nunique": nunique,
+        "duplicates": int(duplicates),
+        "describe": df.describe(),
+    }
+
+
+def profile_all(conn, tables=TABLES):
+    """Load (or reuse) every table once and profile it; returns {table: profile}"""
+    cursor = conn.cursor()
+    version = ingestion_version(cursor)
+    cursor.close()
+    return {table: profile_table(load_table(conn, table, version)) for table in tables}
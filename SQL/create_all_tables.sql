@@ -92,6 +92,153 @@ CREATE TABLE `aggregated_users` (
 ) ENGINE=InnoDB AUTO_INCREMENT=40426 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `anomalies`
+--
+
+DROP TABLE IF EXISTS `anomalies`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `anomalies` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `metric` varchar(50) NOT NULL,
+  `district` varchar(150) NOT NULL,
+  `year` int NOT NULL,
+  `quarter` int NOT NULL,
+  `direction` varchar(10) NOT NULL,
+  `value` double DEFAULT NULL,
+  `expected` double DEFAULT NULL,
+  `z_score` double DEFAULT NULL,
+  `detected_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `metric_period` (`metric`,`year`,`quarter`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `district_facts`
+--
+
+DROP TABLE IF EXISTS `district_facts`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `district_facts` (
+  `year` int NOT NULL,
+  `quarter` int NOT NULL,
+  `district_key` varchar(150) NOT NULL,
+  `state_key` varchar(100) NOT NULL,
+  `state` varchar(100) DEFAULT NULL,
+  `district` varchar(100) DEFAULT NULL,
+  `transaction_count` bigint DEFAULT NULL,
+  `transaction_amount` double DEFAULT NULL,
+  `registered_users` bigint DEFAULT NULL,
+  `app_opens` bigint DEFAULT NULL,
+  `insurance_count` bigint DEFAULT NULL,
+  `insurance_amount` double DEFAULT NULL,
+  `transactions_per_user` double GENERATED ALWAYS AS ((`transaction_count` / nullif(`registered_users`,0))) STORED,
+  `amount_per_user` double GENERATED ALWAYS AS ((`transaction_amount` / nullif(`registered_users`,0))) STORED,
+  `amount_per_app_open` double GENERATED ALWAYS AS ((`transaction_amount` / nullif(`app_opens`,0))) STORED,
+  `opens_per_user` double GENERATED ALWAYS AS ((`app_opens` / nullif(`registered_users`,0))) STORED,
+  `avg_transaction_value` double GENERATED ALWAYS AS ((`transaction_amount` / nullif(`transaction_count`,0))) STORED,
+  `insurance_penetration` double GENERATED ALWAYS AS ((`insurance_count` / nullif(`registered_users`,0))) STORED,
+  PRIMARY KEY (`year`,`quarter`,`district_key`),
+  KEY `entity_lookup` (`district_key`),
+  KEY `state_period` (`state_key`,`year`,`quarter`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `ingest_changes`
+--
+
+DROP TABLE IF EXISTS `ingest_changes`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ingest_changes` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `loader` varchar(50) NOT NULL,
+  `table_name` varchar(64) NOT NULL,
+  `state` varchar(100) DEFAULT NULL,
+  `year` int DEFAULT NULL,
+  `quarter` int DEFAULT NULL,
+  `changed_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `table_name` (`table_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `ingest_checkpoints`
+--
+
+DROP TABLE IF EXISTS `ingest_checkpoints`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ingest_checkpoints` (
+  `loader` varchar(50) NOT NULL,
+  `file_path` varchar(255) NOT NULL,
+  `row_count` int DEFAULT NULL,
+  `loaded_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`loader`,`file_path`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `ingest_partition_totals`
+--
+
+DROP TABLE IF EXISTS `ingest_partition_totals`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ingest_partition_totals` (
+  `loader` varchar(50) NOT NULL,
+  `state` varchar(100) NOT NULL,
+  `year` int NOT NULL,
+  `quarter` int NOT NULL,
+  `value_1` double DEFAULT NULL,
+  `value_2` double DEFAULT NULL,
+  PRIMARY KEY (`loader`,`state`,`year`,`quarter`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `insurance_heatmap_bins`
+--
+
+DROP TABLE IF EXISTS `insurance_heatmap_bins`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `insurance_heatmap_bins` (
+  `year` int NOT NULL,
+  `quarter` int NOT NULL,
+  `zoom` int NOT NULL,
+  `cell_row` int NOT NULL,
+  `cell_col` int NOT NULL,
+  `lat` double DEFAULT NULL,
+  `lng` double DEFAULT NULL,
+  `metric` double DEFAULT NULL,
+  `point_count` int DEFAULT NULL,
+  PRIMARY KEY (`year`,`quarter`,`zoom`,`cell_row`,`cell_col`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `insurance_heatmap_meta`
+--
+
+DROP TABLE IF EXISTS `insurance_heatmap_meta`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `insurance_heatmap_meta` (
+  `year` int NOT NULL,
+  `quarter` int NOT NULL,
+  `grid_level` int DEFAULT NULL,
+  `point_count` int DEFAULT NULL,
+  `total_metric` double DEFAULT NULL,
+  PRIMARY KEY (`year`,`quarter`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `map_insurances`
 --
@@ -163,7 +310,8 @@ CREATE TABLE `top_insurances` (
   `level_type` varchar(20) DEFAULT NULL,
   `insurance_count` bigint DEFAULT NULL,
   `insurance_amount` double DEFAULT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `entity_lookup` (`state_or_district_or_pincode`)
 ) ENGINE=InnoDB AUTO_INCREMENT=19996 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -182,7 +330,8 @@ CREATE TABLE `top_transactions` (
   `level_type` varchar(20) DEFAULT NULL,
   `transaction_count` bigint DEFAULT NULL,
   `transaction_amount` double DEFAULT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `entity_lookup` (`state_or_district_or_pincode`)
 ) ENGINE=InnoDB AUTO_INCREMENT=29992 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -200,7 +349,8 @@ CREATE TABLE `top_users` (
   `state_or_district_or_pincode` varchar(100) DEFAULT NULL,
   `level_type` varchar(20) DEFAULT NULL,
   `registered_users` bigint DEFAULT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `entity_lookup` (`state_or_district_or_pincode`)
 ) ENGINE=InnoDB AUTO_INCREMENT=30001 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
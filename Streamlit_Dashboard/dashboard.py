@@ -1,10 +1,36 @@
+import os
+import sys
+import threading
 import streamlit as st
 import pandas as pd
 import pymysql
-import plotly.express as px
 import warnings
 from datetime import datetime
 
+from lazy_import import lazy_module
+import figure_cache
+import query_stats
+
+# Shared helpers (name keys, etc.) live next to the loader scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import build_insurance_heatmap
+import change_feed
+import dashboard_queries
+import db_pool
+import filter_options
+import frame_loader
+import geo_layer
+import growth_cube
+import name_keys
+import search_index
+import shared_cache
+import snapshots
+import topk_index
+
+# plotly.express is slow to import; it loads with the first chart (or the warm-up below)
+px = lazy_module("plotly.express")
+
 # Ignore warnings for cleaner output
 warnings.filterwarnings("ignore")
 
@@ -40,32 +66,63 @@ st.markdown("""
 # ==============================================================================
 # DATABASE CONNECTION
 # ==============================================================================
-@st.cache_resource
-def connect_to_database():
+# Both can be tuned with scripts/load_test.py
+DB_POOL_SIZE = int(os.environ.get("DASHBOARD_DB_POOL", "4"))
+QUERY_CACHE_ENTRIES = int(os.environ.get("DASHBOARD_QUERY_CACHE", "512"))
+
+def open_connection():
     """Create a connection to MySQL database"""
-    try:
-        connection = pymysql.connect(
-            host="localhost",
-            user="root",
-            password="root",
-            database="phone_pe",
-            autocommit=True
-        )
-        return connection
-    except Exception as e:
-        st.error(f"❌ Cannot connect to database: {e}")
-        st.stop()
+    return pymysql.connect(
+        host="localhost",
+        user="root",
+        password="root",
+        database="phone_pe",
+        autocommit=True
+    )
+
+@st.cache_resource
+def connection_pool():
+    """Connections shared by all sessions; every query borrows one for its duration"""
+    return db_pool.ConnectionPool(open_connection, size=DB_POOL_SIZE)
+
+@st.cache_resource
+def change_tracker():
+    """Table versions from the ingest_changes feed, shared by all sessions"""
+    return change_feed.TableVersions()
+
+def poll_changes():
+    """Read loads committed since the last poll from the change feed"""
+    with connection_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            return change_tracker().poll(cursor)
+        finally:
+            cursor.close()
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def fetch_query(sql_query, versions):
+    """Query results, cached until a table they read changes (versions is part of the key)"""
+    query_stats.count("misses")
+    with connection_pool().connection() as conn:
+        return frame_loader.read_frame(sql_query, conn)
 
 def run_query(sql_query):
-    """Run a SQL query and return results as DataFrame"""
+    """Run a SQL query and return results as a compact, typed DataFrame"""
+    query_stats.lookup(sql_query)
     try:
-        conn = connect_to_database()
-        df = pd.read_sql(sql_query, conn)
-        return df
+        return fetch_query(sql_query, change_tracker().version(sql_query))
     except Exception as e:
         st.error(f"❌ Query failed: {e}")
         return pd.DataFrame()
 
+# Pick up loads committed since the last run before any query is served
+try:
+    poll_changes()
+except Exception as e:
+    st.error(f"❌ Cannot connect to database: {e}")
+    st.stop()
+st.session_state["seen_change_id"] = change_tracker().last_id or 0
+
 # ==============================================================================
 # HEADER SECTION
 # ==============================================================================
@@ -81,21 +138,43 @@ st.markdown("""
 # ==============================================================================
 st.sidebar.header("🔍 Filters")
 
-# Get available years from database
-years_query = "SELECT DISTINCT year FROM aggregated_transactions ORDER BY year DESC"
-years_df = run_query(years_query)
+@st.cache_data
+def load_filter_options(mtime):
+    """Filter values written at ingest (scripts/filter_options.py), reread when the file changes"""
+    return filter_options.load_options()
+
+def option_list(name):
+    """Values of one filter from the options file; None if the file is missing or stale"""
+    if not os.path.exists(filter_options.OPTIONS_PATH):
+        return None
+    options = load_filter_options(os.path.getmtime(filter_options.OPTIONS_PATH))
+    if options is None:
+        return None
+    if change_tracker().versions.get(filter_options.SOURCE_TABLE, 0) > options.get("version", 0):
+        return None  # loaded again since the file was written
+    return options.get(name)
+
+def query_list(name, column):
+    """Values of one filter straight from the database"""
+    df = run_query(filter_options.OPTION_QUERIES[name])
+    return df[column].tolist() if not df.empty else []
+
+# Get available years
+year_list = option_list("years")
+if year_list is None:
+    year_list = query_list("years", "year")
 
-if not years_df.empty:
-    year_list = years_df['year'].tolist()
+if year_list:
     selected_year = st.sidebar.selectbox("📅 Select Year", year_list)
 else:
     st.error("No data available in database")
     st.stop()
 
 # Get available states
-states_query = "SELECT DISTINCT state FROM aggregated_transactions ORDER BY state"
-states_df = run_query(states_query)
-state_list = ["All States"] + states_df['state'].tolist()
+states = option_list("states")
+if states is None:
+    states = query_list("states", "state")
+state_list = ["All States"] + states
 selected_state = st.sidebar.selectbox("📍 Select State", state_list)
 
 # Quarter selection
@@ -103,15 +182,64 @@ quarter_options = ["All Quarters", "Q1", "Q2", "Q3", "Q4"]
 selected_quarter = st.sidebar.selectbox("📊 Select Quarter", quarter_options)
 
 # Transaction type selection
-types_query = "SELECT DISTINCT transaction_type FROM aggregated_transactions"
-types_df = run_query(types_query)
-type_list = ["All Types"] + types_df['transaction_type'].tolist()
+types = option_list("types")
+if types is None:
+    types = query_list("types", "transaction_type")
+type_list = ["All Types"] + types
 selected_type = st.sidebar.selectbox("💳 Transaction Type", type_list)
 
+# District / pincode search over a prefix index (scripts/search_index.py)
+@st.cache_resource
+def load_search_index(mtime):
+    """(index, source versions) written at ingest, reread when the file changes"""
+    return search_index.load_index()
+
+@st.cache_resource(max_entries=2)
+def query_search_index(versions):
+    """Index built from the database when the file is missing or stale (versions is part of the key)"""
+    districts = run_query(search_index.NAME_QUERIES["district"])
+    pincodes = run_query(search_index.NAME_QUERIES["pincode"])
+    return search_index.PrefixIndex(search_index.entities_from_rows(
+        districts.itertuples(index=False), pincodes.itertuples(index=False)
+    ))
+
+def entity_index():
+    """Prefix index of every district and pincode, current with the change feed"""
+    versions = {table: change_tracker().versions.get(table, 0) for table in search_index.SOURCE_TABLES}
+    if os.path.exists(search_index.SEARCH_PATH):
+        saved = load_search_index(os.path.getmtime(search_index.SEARCH_PATH))
+        if saved is not None and all(versions[t] <= saved[1].get(t, 0) for t in versions):
+            return saved[0]
+    return query_search_index(tuple(sorted(versions.items())))
+
+# Searches when the text is submitted (Enter or leaving the box), not on every keystroke
+search_text = st.sidebar.text_input("🔎 Find District or Pincode", placeholder="e.g. pune, 4110, then Enter")
+selected_entity = None
+if search_text:
+    matches = entity_index().search(search_text)
+    if matches:
+        selected_entity = st.sidebar.selectbox("Matches", matches, format_func=search_index.entry_label)
+    else:
+        st.sidebar.caption("No district or pincode starts with that.")
+
 # Refresh button
 if st.sidebar.button("🔄 Refresh Data"):
     st.rerun()
 
+# Live updates: poll the change feed and rerun as soon as a load is committed.
+# Only queries on the changed tables miss the cache on that rerun.
+LIVE_POLL_SECONDS = 5
+
+def watch_changes():
+    """Rerun the app when the change feed has entries this session has not seen"""
+    poll_changes()
+    if (change_tracker().last_id or 0) > st.session_state["seen_change_id"]:
+        st.rerun()
+
+if hasattr(st, "fragment"):
+    with st.sidebar:
+        st.fragment(watch_changes, run_every=LIVE_POLL_SECONDS)()
+
 # ==============================================================================
 # HELPER FUNCTIONS
 # ==============================================================================
@@ -137,54 +265,121 @@ def format_count(count):
     else:
         return f"{count:.0f}"
 
+@st.cache_resource
+def load_topk_index(mtime):
+    """Load the precomputed top-K index (reloaded whenever the file's mtime changes)"""
+    return topk_index.TopKIndex.load()
+
+def top_k_frame(level, metric, year, n, columns):
+    """Top-n rows from the precomputed index as a DataFrame, or None if not indexed"""
+    if not os.path.exists(topk_index.INDEX_PATH):
+        return None
+    index = load_topk_index(os.path.getmtime(topk_index.INDEX_PATH))
+    if index is None or not index.has(level, metric, year):
+        return None
+    # Stale once its source table has new loads; the live query is used until the index is rebuilt
+    built_at = datetime.strptime(index.built_at, "%Y-%m-%d %H:%M:%S") if index.built_at else None
+    if change_tracker().changed_after(topk_index.source_table(level, metric), built_at):
+        return None
+    fields, rows = index.top(level, metric, year, n=n)
+    return pd.DataFrame(rows, columns=columns[:len(fields) + 1])
+
+@st.cache_resource
+def load_snapshot_store(mtime):
+    """Open the precomputed payloads (reopened whenever manifest.json is rewritten)"""
+    return snapshots.SnapshotStore.load()
+
+def snapshot_payload(year, state=None, quarter=None, txn_type=None):
+    """Precomputed payload of a filter key (or of a year), or None without a current snapshot"""
+    manifest_path = os.path.join(snapshots.SNAPSHOT_DIR, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    store = load_snapshot_store(os.path.getmtime(manifest_path))
+    if store is None or not store.is_current(change_tracker().versions):
+        return None
+    return store.payload(year, state, quarter, txn_type)
+
+def snapshot_frame(payload, part):
+    """One chart's rows from a payload as a DataFrame, or None"""
+    if payload is None or part not in payload:
+        return None
+    return pd.DataFrame(payload[part]["rows"], columns=payload[part]["columns"])
+
+@st.cache_resource
+def load_shared_cache(mtime):
+    """Open the memory-mapped cache shared by all worker processes (reopened on rebuild)"""
+    return shared_cache.SharedCache.load()
+
+def shared_data(table):
+    """The shared cache if it holds a current copy of the table, else None"""
+    manifest_path = os.path.join(shared_cache.SHARED_DIR, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    shared = load_shared_cache(os.path.getmtime(manifest_path))
+    if shared is None or not shared.is_current(table, change_tracker().versions):
+        return None
+    return shared
+
+def shared_rows(table, year, n=50):
+    """First n rows of a year from the shared cache, or None"""
+    shared = shared_data(table)
+    df = shared.frame(table) if shared is not None else None
+    if df is None:
+        return None
+    return df[df["year"] == int(year)].head(n)
+
 # ==============================================================================
-# BUILD SQL WHERE CLAUSE BASED ON FILTERS
+# BACKGROUND WARM-UP (once per server process; set DASHBOARD_WARMUP=0 to disable)
 # ==============================================================================
-def build_where_clause(year, state, quarter, txn_type, table_name="aggregated_transactions"):
-    """Build WHERE clause for SQL queries based on selected filters"""
-    conditions = [f"year = {year}"]
-    
-    if state != "All States":
-        conditions.append(f"state = '{state}'")
-    
-    if quarter != "All Quarters":
-        quarter_num = quarter.replace("Q", "")
-        conditions.append(f"quarter = {quarter_num}")
-    
-    if txn_type != "All Types" and table_name == "aggregated_transactions":
-        conditions.append(f"transaction_type = '{txn_type}'")
-    
-    return " AND ".join(conditions)
+def warm_up():
+    """Import the plotting modules and open the shared caches while the page renders"""
+    try:
+        px.load()
+        for level in geo_layer.GEO_FILES:
+            geo_layer.load_geometry(level)
+        if os.path.exists(topk_index.INDEX_PATH):
+            load_topk_index(os.path.getmtime(topk_index.INDEX_PATH))
+    except Exception as e:
+        print(f"Dashboard warm-up failed: {e}")
+
+@st.cache_resource
+def start_warm_up():
+    if os.environ.get("DASHBOARD_WARMUP", "1") == "0":
+        return None
+    thread = threading.Thread(target=warm_up, name="dashboard-warm-up", daemon=True)
+    try:
+        # Lets the thread use st.cache_* without "missing ScriptRunContext" warnings
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(thread)
+    except ImportError:
+        pass
+    thread.start()
+    return thread
+
+start_warm_up()
 
 # ==============================================================================
 # KEY METRICS SECTION
 # ==============================================================================
 st.markdown("## 📊 Key Metrics")
 
-# Build WHERE clause for queries
-where_clause = build_where_clause(selected_year, selected_state, selected_quarter, selected_type)
+# Precomputed payloads (scripts/snapshots.py) replace the queries below when current
+key_payload = snapshot_payload(selected_year, selected_state, selected_quarter, selected_type)
+year_payload = snapshot_payload(selected_year)
 
 # Get transaction metrics
-txn_metrics_query = f"""
-    SELECT 
-        SUM(transaction_count) as total_transactions,
-        SUM(transaction_amount) as total_amount,
-        AVG(transaction_amount/transaction_count) as avg_transaction_value
-    FROM aggregated_transactions 
-    WHERE {where_clause}
-"""
-txn_metrics = run_query(txn_metrics_query)
+txn_metrics_query = dashboard_queries.txn_metrics_sql(selected_year, selected_state, selected_quarter, selected_type)
+if key_payload is not None:
+    txn_metrics = pd.DataFrame([key_payload["metrics"]])
+else:
+    txn_metrics = run_query(txn_metrics_query)
 
 # Get user metrics
-user_where = build_where_clause(selected_year, selected_state, selected_quarter, selected_type, "map_users")
-user_metrics_query = f"""
-    SELECT 
-        SUM(registered_users) as total_users,
-        SUM(app_opens) as total_app_opens
-    FROM map_users 
-    WHERE {user_where}
-"""
-user_metrics = run_query(user_metrics_query)
+user_metrics_query = dashboard_queries.user_metrics_sql(selected_year, selected_state, selected_quarter, selected_type)
+if key_payload is not None:
+    user_metrics = pd.DataFrame([key_payload["metrics"]])
+else:
+    user_metrics = run_query(user_metrics_query)
 
 # Display metrics in columns
 col1, col2, col3, col4 = st.columns(4)
@@ -217,10 +412,63 @@ with col4:
     else:
         st.metric("📈 Avg Transaction", "₹0")
 
+# ==============================================================================
+# SEARCH DRILL-DOWN
+# ==============================================================================
+# Quarter-by-quarter history of the district or pincode picked in the sidebar,
+# read by the indexed lookup column (district_key / state_or_district_or_pincode)
+if selected_entity is not None:
+    st.markdown(f"## 🔎 {search_index.entry_label(selected_entity)}")
+    entity_data = pd.DataFrame()
+    if selected_entity.kind == "district":
+        if "district_facts" not in change_tracker().versions:
+            st.info("No district facts yet. Load the map tables or run `python scripts/district_facts.py`.")
+        else:
+            entity_data = run_query(f"""
+                SELECT year, quarter, transaction_count, transaction_amount,
+                       registered_users, app_opens, insurance_count, transactions_per_user
+                FROM district_facts
+                WHERE district_key = '{selected_entity.key}'
+                ORDER BY year, quarter
+            """)
+    else:
+        for table, columns in [("top_transactions", "transaction_count, transaction_amount"),
+                               ("top_users", "registered_users"),
+                               ("top_insurances", "insurance_count")]:
+            pincode_data = run_query(f"""
+                SELECT year, quarter, {columns}
+                FROM {table}
+                WHERE state_or_district_or_pincode = '{selected_entity.key}'
+            """)
+            if entity_data.empty:
+                entity_data = pincode_data
+            elif not pincode_data.empty:
+                entity_data = entity_data.merge(pincode_data, on=["year", "quarter"], how="outer")
+        if not entity_data.empty:
+            entity_data = entity_data.sort_values(["year", "quarter"])
+
+    if not entity_data.empty:
+        entity_data.insert(0, "period", entity_data["year"].astype(str) + " Q" + entity_data["quarter"].astype(str))
+        entity_metric = "transaction_count" if "transaction_count" in entity_data else entity_data.columns[3]
+        fig16 = figure_cache.cached_figure(
+            "line",
+            entity_data,
+            x="period",
+            y=entity_metric,
+            markers=True,
+            title=f"{search_index.entry_label(selected_entity)}: {entity_metric.replace('_', ' ').title()}"
+        )
+        st.plotly_chart(fig16, use_container_width=True)
+        st.dataframe(entity_data.drop(columns=["year", "quarter"]), use_container_width=True, hide_index=True)
+    else:
+        st.info("No records for this district or pincode.")
+
 # ==============================================================================
 # MAIN CONTENT - TABS
 # ==============================================================================
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Transactions", "👥 Users", "🛡️ Insurance", "📋 Data Tables"])
+tab1, tab2, tab3, tab6, tab5, tab4 = st.tabs(
+    ["📊 Transactions", "👥 Users", "🛡️ Insurance", "📈 Growth", "🗺️ Map", "📋 Data Tables"]
+)
 
 # ------------------------------------------------------------------------------
 # TAB 1: TRANSACTIONS
@@ -229,68 +477,57 @@ with tab1:
     st.header("Transaction Analysis")
     
     # Query for quarterly trends
-    quarterly_query = f"""
-        SELECT 
-            quarter,
-            SUM(transaction_count) as transactions,
-            SUM(transaction_amount) as amount
-        FROM aggregated_transactions 
-        WHERE {where_clause}
-        GROUP BY quarter
-        ORDER BY quarter
-    """
-    quarterly_data = run_query(quarterly_query)
+    quarterly_query = dashboard_queries.quarterly_sql(selected_year, selected_state, selected_quarter, selected_type)
+    quarterly_data = snapshot_frame(key_payload, "quarterly")
+    if quarterly_data is None:
+        quarterly_data = run_query(quarterly_query)
     
     if not quarterly_data.empty:
         col1, col2 = st.columns(2)
         
         with col1:
             # Line chart for transaction count
-            fig1 = px.line(
-                quarterly_data, 
-                x='quarter', 
+            fig1 = figure_cache.cached_figure(
+                "line",
+                quarterly_data,
+                x='quarter',
                 y='transactions',
                 title="Transaction Count by Quarter",
-                markers=True
+                markers=True,
+                xaxes=dict(title="Quarter"),
+                yaxes=dict(title="Number of Transactions")
             )
-            fig1.update_xaxes(title="Quarter")
-            fig1.update_yaxes(title="Number of Transactions")
             st.plotly_chart(fig1, use_container_width=True)
         
         with col2:
             # Bar chart for transaction amount
-            fig2 = px.bar(
+            fig2 = figure_cache.cached_figure(
+                "bar",
                 quarterly_data,
                 x='quarter',
                 y='amount',
                 title="Transaction Amount by Quarter",
-                color='amount'
+                color='amount',
+                xaxes=dict(title="Quarter"),
+                yaxes=dict(title="Amount (₹)")
             )
-            fig2.update_xaxes(title="Quarter")
-            fig2.update_yaxes(title="Amount (₹)")
             st.plotly_chart(fig2, use_container_width=True)
     
     # Transaction types breakdown
     st.subheader("Transaction Types")
     
-    type_query = f"""
-        SELECT 
-            transaction_type,
-            SUM(transaction_count) as count,
-            SUM(transaction_amount) as amount
-        FROM aggregated_transactions 
-        WHERE year = {selected_year}
-        GROUP BY transaction_type
-        ORDER BY count DESC
-    """
-    type_data = run_query(type_query)
+    type_query = dashboard_queries.types_sql(selected_year)
+    type_data = snapshot_frame(year_payload, "types")
+    if type_data is None:
+        type_data = run_query(type_query)
     
     if not type_data.empty:
         col1, col2 = st.columns(2)
         
         with col1:
             # Pie chart for transaction types
-            fig3 = px.pie(
+            fig3 = figure_cache.cached_figure(
+                "pie",
                 type_data,
                 values='count',
                 names='transaction_type',
@@ -300,40 +537,37 @@ with tab1:
         
         with col2:
             # Bar chart for amounts by type
-            fig4 = px.bar(
+            fig4 = figure_cache.cached_figure(
+                "bar",
                 type_data,
                 x='transaction_type',
                 y='amount',
-                title="Amount by Transaction Type"
+                title="Amount by Transaction Type",
+                xaxes=dict(tickangle=45)
             )
-            fig4.update_xaxes(tickangle=45)
             st.plotly_chart(fig4, use_container_width=True)
     
     # Top states
     st.subheader("Top 10 States")
     
-    states_query = f"""
-        SELECT 
-            state,
-            SUM(transaction_count) as transactions,
-            SUM(transaction_amount) as amount
-        FROM aggregated_transactions 
-        WHERE year = {selected_year}
-        GROUP BY state
-        ORDER BY transactions DESC
-        LIMIT 10
-    """
-    states_data = run_query(states_query)
+    states_query = dashboard_queries.states_sql(selected_year)
+    states_data = snapshot_frame(year_payload, "states")
+    if states_data is None:
+        states_data = top_k_frame("state", "transaction_count", selected_year, 10,
+                                  ["state", "transactions", "amount"])
+    if states_data is None:
+        states_data = run_query(states_query)
     
     if not states_data.empty:
-        fig5 = px.bar(
+        fig5 = figure_cache.cached_figure(
+            "bar",
             states_data,
             x='state',
             y='transactions',
             title="Top 10 States by Transaction Count",
-            color='transactions'
+            color='transactions',
+            xaxes=dict(tickangle=45)
         )
-        fig5.update_xaxes(tickangle=45)
         st.plotly_chart(fig5, use_container_width=True)
 
 # ------------------------------------------------------------------------------
@@ -343,37 +577,34 @@ with tab2:
     st.header("User Analysis")
     
     # User growth by state
-    user_state_query = f"""
-        SELECT 
-            state,
-            SUM(registered_users) as users,
-            SUM(app_opens) as app_opens
-        FROM map_users 
-        WHERE year = {selected_year}
-        GROUP BY state
-        ORDER BY users DESC
-        LIMIT 15
-    """
-    user_state_data = run_query(user_state_query)
+    user_state_query = dashboard_queries.user_states_sql(selected_year)
+    user_state_data = snapshot_frame(year_payload, "user_states")
+    if user_state_data is None:
+        user_state_data = top_k_frame("district", "registered_users", selected_year, 15,
+                                      ["state", "users", "app_opens"])
+    if user_state_data is None:
+        user_state_data = run_query(user_state_query)
     
     if not user_state_data.empty:
         col1, col2 = st.columns(2)
         
         with col1:
-            # Bar chart for users by state
-            fig6 = px.bar(
+            # Bar chart for users by district
+            fig6 = figure_cache.cached_figure(
+                "bar",
                 user_state_data,
                 x='state',
                 y='users',
-                title="Top States by User Count",
-                color='users'
+                title="Top Districts by User Count",
+                color='users',
+                xaxes=dict(tickangle=45)
             )
-            fig6.update_xaxes(tickangle=45)
             st.plotly_chart(fig6, use_container_width=True)
         
         with col2:
             # Scatter plot for engagement
-            fig7 = px.scatter(
+            fig7 = figure_cache.cached_figure(
+                "scatter",
                 user_state_data,
                 x='users',
                 y='app_opens',
@@ -386,29 +617,71 @@ with tab2:
     # Device brands
     st.subheader("Popular Device Brands")
     
-    device_query = f"""
-        SELECT 
-            device_brand,
-            SUM(device_count) as count
-        FROM aggregated_users 
-        WHERE year = {selected_year}
-        GROUP BY device_brand
-        ORDER BY count DESC
-        LIMIT 10
-    """
-    device_data = run_query(device_query)
+    device_query = dashboard_queries.devices_sql(selected_year)
+    device_data = snapshot_frame(year_payload, "devices")
+    if device_data is None:
+        device_data = top_k_frame("device_brand", "device_count", selected_year, 10,
+                                  ["device_brand", "count"])
+    if device_data is None:
+        device_data = run_query(device_query)
     
     if not device_data.empty:
-        fig8 = px.bar(
+        fig8 = figure_cache.cached_figure(
+            "bar",
             device_data,
             x='device_brand',
             y='count',
             title="Top 10 Device Brands",
-            color='count'
+            color='count',
+            xaxes=dict(tickangle=45)
         )
-        fig8.update_xaxes(tickangle=45)
         st.plotly_chart(fig8, use_container_width=True)
 
+    # Cross-dataset ratios read straight from the district fact table (no joins)
+    st.subheader("District Engagement Ratios")
+    ratio_options = {
+        "Transactions per User": "transactions_per_user",
+        "Amount per App Open": "amount_per_app_open",
+        "App Opens per User": "opens_per_user",
+        "Insurance Policies per User": "insurance_penetration",
+    }
+    if "district_facts" not in change_tracker().versions:
+        st.info("No district facts yet. Load the map tables or run `python scripts/district_facts.py`.")
+    else:
+        ratio_label = st.selectbox("Ratio", list(ratio_options))
+        ratio = ratio_options[ratio_label]
+        # Registered users are a running total, so ratios use one quarter (latest of the year by default)
+        if selected_quarter != "All Quarters":
+            ratio_quarter = selected_quarter.replace("Q", "")
+        else:
+            ratio_quarter = f"(SELECT MAX(quarter) FROM district_facts WHERE year = {selected_year})"
+        ratio_where = f"year = {selected_year} AND quarter = {ratio_quarter} AND {ratio} IS NOT NULL"
+        if selected_state != "All States":
+            ratio_where += f" AND state_key = '{name_keys.name_key(selected_state)}'"
+        ratio_data = run_query(f"""
+            SELECT state, district, {ratio}
+            FROM district_facts
+            WHERE {ratio_where}
+            ORDER BY {ratio} DESC
+            LIMIT 15
+        """)
+
+        if not ratio_data.empty:
+            fig15 = figure_cache.cached_figure(
+                "bar",
+                ratio_data,
+                x='district',
+                y=ratio,
+                hover_data=['state'],
+                title=f"Top Districts by {ratio_label}",
+                color=ratio,
+                xaxes=dict(tickangle=45),
+                yaxes=dict(title=ratio_label)
+            )
+            st.plotly_chart(fig15, use_container_width=True)
+        else:
+            st.info("No district facts for the selected period.")
+
 # ------------------------------------------------------------------------------
 # TAB 3: INSURANCE
 # ------------------------------------------------------------------------------
@@ -416,71 +689,285 @@ with tab3:
     st.header("Insurance Analysis")
     
     # Insurance metrics
-    insurance_query = f"""
-        SELECT 
-            state,
-            SUM(insurance_count) as policies,
-            SUM(insurance_amount) as amount
-        FROM aggregated_insurances 
-        WHERE year = {selected_year}
-        GROUP BY state
-        ORDER BY policies DESC
-        LIMIT 10
-    """
-    insurance_data = run_query(insurance_query)
+    insurance_query = dashboard_queries.insurance_states_sql(selected_year)
+    insurance_data = snapshot_frame(year_payload, "insurance_states")
+    if insurance_data is None:
+        insurance_data = top_k_frame("state", "insurance_count", selected_year, 10,
+                                     ["state", "policies", "amount"])
+    if insurance_data is None:
+        insurance_data = run_query(insurance_query)
     
     if not insurance_data.empty:
         col1, col2 = st.columns(2)
         
         with col1:
             # Bar chart for insurance policies
-            fig9 = px.bar(
+            fig9 = figure_cache.cached_figure(
+                "bar",
                 insurance_data,
                 x='state',
                 y='policies',
                 title="Top States by Insurance Policies",
-                color='policies'
+                color='policies',
+                xaxes=dict(tickangle=45)
             )
-            fig9.update_xaxes(tickangle=45)
             st.plotly_chart(fig9, use_container_width=True)
         
         with col2:
             # Bar chart for insurance amount
-            fig10 = px.bar(
+            fig10 = figure_cache.cached_figure(
+                "bar",
                 insurance_data,
                 x='state',
                 y='amount',
                 title="Insurance Amount by State",
-                color='amount'
+                color='amount',
+                xaxes=dict(tickangle=45)
             )
-            fig10.update_xaxes(tickangle=45)
             st.plotly_chart(fig10, use_container_width=True)
     
     # Quarterly insurance trends
-    insurance_quarterly_query = f"""
-        SELECT 
-            quarter,
-            SUM(insurance_count) as policies,
-            SUM(insurance_amount) as amount
-        FROM aggregated_insurances 
-        WHERE year = {selected_year}
-        GROUP BY quarter
-        ORDER BY quarter
-    """
-    insurance_quarterly = run_query(insurance_quarterly_query)
+    insurance_quarterly_query = dashboard_queries.insurance_quarterly_sql(selected_year)
+    insurance_quarterly = snapshot_frame(year_payload, "insurance_quarterly")
+    if insurance_quarterly is None:
+        insurance_quarterly = run_query(insurance_quarterly_query)
     
     if not insurance_quarterly.empty:
-        fig11 = px.line(
+        fig11 = figure_cache.cached_figure(
+            "line",
             insurance_quarterly,
             x='quarter',
             y='policies',
             title="Insurance Policies by Quarter",
-            markers=True
+            markers=True,
+            xaxes=dict(title="Quarter"),
+            yaxes=dict(title="Number of Policies")
         )
-        fig11.update_xaxes(title="Quarter")
-        fig11.update_yaxes(title="Number of Policies")
         st.plotly_chart(fig11, use_container_width=True)
 
+# ------------------------------------------------------------------------------
+# TAB 6: GROWTH
+# ------------------------------------------------------------------------------
+@st.cache_resource(max_entries=32)
+def load_growth_cube(metric, level, versions):
+    """
+    Load one metric for every entity and quarter in a single query (shared, read-only).
+    versions (from the change feed) makes a new load of the source table rebuild the cube.
+    """
+    with connection_pool().connection() as conn:
+        return growth_cube.load_cube(conn, metric, level)
+
+with tab6:
+    st.header("Growth Analysis")
+
+    growth_metrics = {
+        "Transaction Count": "transaction_count",
+        "Transaction Amount": "transaction_amount",
+        "Registered Users": "registered_users",
+        "App Opens": "app_opens",
+        "Insurance Policies": "insurance_count",
+        "Insurance Amount": "insurance_amount",
+    }
+
+    col1, col2 = st.columns(2)
+    with col1:
+        growth_label = st.selectbox("Growth Metric", list(growth_metrics))
+    with col2:
+        growth_level = st.radio("Growth Level", ["State", "District"], horizontal=True)
+
+    growth_key = (growth_metrics[growth_label], growth_level.lower())
+    growth_sql = growth_cube.METRIC_QUERIES[growth_key]
+    # Memory-mapped cube shared with the other workers, else one query per process
+    shared = shared_data(change_feed.tables_in(growth_sql)[0])
+    cube = shared.cube(*growth_key) if shared is not None else None
+    if cube is None:
+        cube = load_growth_cube(*growth_key, change_tracker().version(growth_sql))
+
+    if cube.values.size:
+        # Selected quarter, or the latest quarter with data in the selected year
+        if selected_quarter != "All Quarters":
+            growth_period = (int(selected_year), int(selected_quarter.replace("Q", "")))
+        else:
+            growth_period = cube.latest_period(selected_year)
+        period_col = cube.period_index(*growth_period) if growth_period else None
+
+        # National trend: QoQ and YoY growth of the all-entity total
+        total = cube.total()
+        trend = pd.DataFrame({
+            "period": [f"{y} Q{q}" for y, q in total.periods],
+            "QoQ Growth %": total.qoq()[0] * 100,
+            "YoY Growth %": total.yoy()[0] * 100,
+        })
+        fig12 = figure_cache.cached_figure(
+            "line",
+            trend,
+            x='period',
+            y=['QoQ Growth %', 'YoY Growth %'],
+            title=f"{growth_label}: Growth of All-India Total",
+            markers=True,
+            xaxes=dict(title="Quarter", tickangle=45),
+            yaxes=dict(title="Growth (%)")
+        )
+        st.plotly_chart(fig12, use_container_width=True)
+
+        if period_col is not None:
+            col1, col2 = st.columns(2)
+
+            with col1:
+                yoy_top = cube.top(cube.yoy()[:, period_col], 10)
+                if yoy_top:
+                    yoy_data = pd.DataFrame(yoy_top, columns=[growth_level, "YoY Growth %"])
+                    yoy_data["YoY Growth %"] *= 100
+                    fig13 = figure_cache.cached_figure(
+                        "bar",
+                        yoy_data,
+                        x=growth_level,
+                        y='YoY Growth %',
+                        title=f"Fastest YoY Growth ({growth_period[0]} Q{growth_period[1]})",
+                        color='YoY Growth %',
+                        xaxes=dict(tickangle=45)
+                    )
+                    st.plotly_chart(fig13, use_container_width=True)
+
+            with col2:
+                cagr_top = cube.top(cube.cagr(), 10)
+                if cagr_top:
+                    cagr_data = pd.DataFrame(cagr_top, columns=[growth_level, "CAGR %"])
+                    cagr_data["CAGR %"] *= 100
+                    fig14 = figure_cache.cached_figure(
+                        "bar",
+                        cagr_data,
+                        x=growth_level,
+                        y='CAGR %',
+                        title="Highest Compound Annual Growth (all quarters)",
+                        color='CAGR %',
+                        xaxes=dict(tickangle=45)
+                    )
+                    st.plotly_chart(fig14, use_container_width=True)
+        else:
+            st.info("No data for the selected period.")
+
+    # District spikes and collapses, flagged after each load of a map_* table
+    st.subheader("District Anomalies")
+    if "anomalies" not in change_tracker().versions:
+        st.info("No anomalies computed yet. Run `python scripts/anomalies.py` after loading the map tables.")
+    else:
+        anomaly_where = f"metric = '{growth_metrics[growth_label]}' AND year = {selected_year}"
+        if selected_quarter != "All Quarters":
+            anomaly_where += f" AND quarter = {selected_quarter.replace('Q', '')}"
+        anomaly_data = run_query(f"""
+            SELECT district, quarter, direction, value, expected, z_score
+            FROM anomalies
+            WHERE {anomaly_where}
+            ORDER BY ABS(z_score) DESC
+            LIMIT 50
+        """)
+        if not anomaly_data.empty:
+            st.dataframe(anomaly_data, use_container_width=True, hide_index=True)
+        else:
+            st.info("No anomalies for the selected period.")
+
+# ------------------------------------------------------------------------------
+# TAB 5: MAP
+# ------------------------------------------------------------------------------
+with tab5:
+    st.header("Geographic View")
+
+    map_metrics = {
+        "Transaction Count": ("map_transactions", "transaction_count"),
+        "Transaction Amount": ("map_transactions", "transaction_amount"),
+        "Insurance Policies": ("map_insurances", "insurance_count"),
+        "Insurance Amount": ("map_insurances", "insurance_amount"),
+    }
+
+    col1, col2 = st.columns(2)
+    with col1:
+        map_level = st.radio("Level", ["State", "District"], horizontal=True)
+    with col2:
+        map_metric = st.selectbox("Metric", list(map_metrics))
+
+    geometry = geo_layer.load_geometry(map_level)
+    if geometry is None:
+        st.info(f"No {map_level.lower()} geometry found. Build it once with "
+                "`python scripts/build_geo_cache.py` (see the script for options).")
+    else:
+        map_table, map_column = map_metrics[map_metric]
+        # State view always shows the whole country; district view follows the state filter
+        map_state = selected_state if map_level == "District" else "All States"
+        map_where = dashboard_queries.build_where_clause(selected_year, map_state, selected_quarter, selected_type, map_table)
+        group_cols = "state, district" if map_level == "District" else "state"
+
+        map_query = f"""
+            SELECT 
+                {group_cols},
+                SUM({map_column}) as value
+            FROM {map_table} 
+            WHERE {map_where}
+            GROUP BY {group_cols}
+        """
+        map_data = run_query(map_query)
+
+        if not map_data.empty:
+            map_data = geo_layer.add_join_keys(map_data, map_level)
+            fig_map = geo_layer.build_choropleth(
+                geometry,
+                map_level,
+                tuple(map_data["key"]),
+                tuple(map_data["name"]),
+                tuple(map_data["value"].astype(float)),
+                map_metric,
+            )
+            st.plotly_chart(fig_map, use_container_width=True)
+
+    # Insurance density from the pre-binned grid (scripts/build_insurance_heatmap.py)
+    st.subheader("Insurance Density")
+
+    detail_levels = build_insurance_heatmap.DETAIL_LEVELS  # the zoom levels the bins are built for
+    detail = st.select_slider("Detail", options=list(detail_levels), value="State")
+    heat_zoom = detail_levels[detail]
+
+    heat_where = f"year = {selected_year} AND zoom = {heat_zoom}"
+    if selected_quarter != "All Quarters":
+        heat_where += f" AND quarter = {selected_quarter.replace('Q', '')}"
+
+    # Only the cells of the requested zoom level are fetched
+    heat_query = f"""
+        SELECT 
+            SUM(lat * metric) / NULLIF(SUM(metric), 0) as lat,
+            SUM(lng * metric) / NULLIF(SUM(metric), 0) as lng,
+            SUM(metric) as policies
+        FROM insurance_heatmap_bins 
+        WHERE {heat_where}
+        GROUP BY cell_row, cell_col
+        HAVING SUM(metric) > 0
+    """
+    heat_data = run_query(heat_query)
+
+    if not heat_data.empty:
+        # plotly 5.24+ draws tile maps with MapLibre (density_map); plotly 7 dropped density_mapbox
+        if hasattr(px, "density_map"):
+            heat_kind, heat_style = "density_map", {"map_style": "carto-positron"}
+        else:
+            heat_kind, heat_style = "density_mapbox", {"mapbox_style": "carto-positron"}
+        fig_heat = figure_cache.cached_figure(
+            heat_kind,
+            heat_data,
+            lat='lat',
+            lon='lng',
+            z='policies',
+            radius=6 + 2 * (build_insurance_heatmap.MAX_ZOOM - heat_zoom),
+            center=dict(lat=22.5, lon=80.0),
+            zoom=3.5,
+            **heat_style,
+            # Scale from the cells drawn: summed cells outgrow the source grid's point percentiles
+            range_color=(0, heat_data['policies'].quantile(0.995)),
+            title=f"Insurance Policies ({len(heat_data):,} cells)",
+            layout=dict(height=600, margin=dict(l=0, r=0, t=40, b=0))
+        )
+        st.plotly_chart(fig_heat, use_container_width=True)
+    else:
+        st.info("No heatmap bins found. Build them with `python scripts/build_insurance_heatmap.py`.")
+
 # ------------------------------------------------------------------------------
 # TAB 4: DATA TABLES
 # ------------------------------------------------------------------------------
@@ -494,7 +981,9 @@ with tab4:
         WHERE year = {selected_year}
         LIMIT 50
     """
-    sample_txn = run_query(sample_txn_query)
+    sample_txn = shared_rows("aggregated_transactions", selected_year)
+    if sample_txn is None:
+        sample_txn = run_query(sample_txn_query)
     
     if not sample_txn.empty:
         st.dataframe(sample_txn)
@@ -506,7 +995,9 @@ with tab4:
         WHERE year = {selected_year}
         LIMIT 50
     """
-    sample_user = run_query(sample_user_query)
+    sample_user = shared_rows("map_users", selected_year)
+    if sample_user is None:
+        sample_user = run_query(sample_user_query)
     
     if not sample_user.empty:
         st.dataframe(sample_user)
@@ -518,7 +1009,9 @@ with tab4:
         WHERE year = {selected_year}
         LIMIT 50
     """
-    sample_insurance = run_query(sample_insurance_query)
+    sample_insurance = shared_rows("aggregated_insurances", selected_year)
+    if sample_insurance is None:
+        sample_insurance = run_query(sample_insurance_query)
     
     if not sample_insurance.empty:
         st.dataframe(sample_insurance)
@@ -0,0 +1,64 @@
+"""
+Helpers for the dashboard's Map tab.
+- Loads the pre-simplified geometry (built by scripts/build_geo_cache.py) once per server process
+- Joins per-filter metric values to map features by normalised name key
+- Caches built choropleth figures per (level, metric values), so switching back
+  to a year/quarter that was already shown skips figure construction
+"""
+import os
+import json
+
+import streamlit as st
+
+from lazy_import import lazy_module
+from name_keys import name_key, district_key
+
+px = lazy_module("plotly.express")  # imported when the first map is built
+
+GEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geo")
+GEO_FILES = {
+    "State": "india_states.min.geojson",
+    "District": "india_districts.min.geojson",
+}
+
+
+@st.cache_resource
+def load_geometry(level):
+    """Load cached geometry for 'State' or 'District'; None if it has not been built"""
+    path = os.path.join(GEO_DIR, GEO_FILES[level])
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def add_join_keys(df, level):
+    """Add the 'key' column used to match rows to map features"""
+    df = df.copy()
+    if level == "District":
+        df["key"] = [district_key(s, d) for s, d in zip(df["state"], df["district"])]
+        df["name"] = df["district"]
+    else:
+        df["key"] = df["state"].map(name_key)
+        df["name"] = df["state"]
+    return df
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_choropleth(_geojson, level, keys, names, values, label):
+    """
+    Build the choropleth figure. The geometry argument is not hashed;
+    `level` identifies it, and keys/names/values are the per-filter vector.
+    """
+    fig = px.choropleth(
+        {"key": keys, "name": names, label: values},
+        geojson=_geojson,
+        locations="key",
+        featureidkey="properties.key",
+        color=label,
+        hover_name="name",
+        color_continuous_scale="Purples",
+    )
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(margin=dict(l=0, r=0, t=30, b=0), height=600)
+    return fig
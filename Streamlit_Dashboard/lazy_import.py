@@ -0,0 +1,29 @@
+"""
+Deferred imports for the dashboard.
+- plotly.express is one of the slowest imports on a cold start; with
+  `px = lazy_module("plotly.express")` it is imported the first time a chart
+  is built, after the header, sidebar and key metrics are already on screen
+- load() imports the module ahead of time (used by the background warm-up)
+"""
+import importlib
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            # import_module holds the import lock, so concurrent first uses are safe
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def lazy_module(name):
+    return LazyModule(name)
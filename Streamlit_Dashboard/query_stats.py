@@ -0,0 +1,34 @@
+"""
+Process-wide counters of the dashboard's data lookups.
+- lookups: run_query calls; misses: those not served by the query cache
+- listeners are called with every looked-up SQL statement; the load test
+  (scripts/load_test.py) uses this to record which queries a rerun issues
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+counts = Counter()
+listeners = []
+
+
+def count(name, n=1):
+    with _lock:
+        counts[name] += n
+
+
+def lookup(sql):
+    """Called by run_query for every query, hit or miss"""
+    count("lookups")
+    for listener in list(listeners):
+        listener(sql)
+
+
+def snapshot():
+    with _lock:
+        return dict(counts)
+
+
+def reset():
+    with _lock:
+        counts.clear()
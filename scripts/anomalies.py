@@ -0,0 +1,184 @@
+"""
+Anomaly detection over district time series.
+- Each district metric (transactions, insurance, users) is loaded once as a
+  district x quarter array with growth_cube (one GROUP BY query per metric)
+- Seasonal residual: change of log(1 + value) against the same quarter a year
+  earlier (zeros count as missing), minus the median change of all districts in that quarter, so a
+  nationwide dip (e.g. Q2 2020) is not flagged in every district
+- Robust z-score of each residual against its district's own history
+  (median / MAD); |z| >= THRESHOLD is a spike or a collapse. Every step is a
+  whole-array operation, no loop over districts
+- Results replace the metric's rows in the anomalies table and are logged to
+  the change feed in the same transaction; the loaders rerun this after
+  loading a map_* table, so the dashboard lists new anomalies right away
+
+District user metrics come from district_facts (keyed by state and district),
+as map_users stores only the district name; they are recomputed after a load
+of map_users, which fills those columns.
+
+Usage:
+    python anomalies.py                                # all metrics
+    python anomalies.py transaction_count --threshold 4
+"""
+import argparse
+import warnings
+
+import numpy as np
+
+from change_feed import log_change, tables_in
+from growth_cube import METRIC_QUERIES, load_cube
+
+THRESHOLD = 3.5     # Iglewicz & Hoaglin's cut-off for modified z-scores
+MIN_HISTORY = 6     # residuals a district needs before any of them is scored
+SEASON = 4          # quarters; residuals compare a quarter with the same one a year earlier
+MAD_SCALE = 0.6745  # makes the MAD comparable to a standard deviation
+MIN_MAD = 0.05      # smallest spread used, in log units (~5%): steady series have a MAD near 0
+
+METRICS = ["transaction_count", "transaction_amount", "insurance_count",
+           "insurance_amount", "registered_users", "app_opens"]
+
+# metric -> table whose load changes it: the table its district query reads
+# (map_transactions, map_insurances), or map_users for the district_facts user columns
+SOURCE_TABLES = {metric: tables_in(METRIC_QUERIES[(metric, "district")])[0] for metric in METRICS}
+SOURCE_TABLES.update(registered_users="map_users", app_opens="map_users")
+
+ANOMALIES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS anomalies (
+        id INT NOT NULL AUTO_INCREMENT,
+        metric VARCHAR(50) NOT NULL,
+        district VARCHAR(150) NOT NULL,
+        year INT NOT NULL,
+        quarter INT NOT NULL,
+        direction VARCHAR(10) NOT NULL,
+        value DOUBLE DEFAULT NULL,
+        expected DOUBLE DEFAULT NULL,
+        z_score DOUBLE DEFAULT NULL,
+        detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id),
+        KEY metric_period (metric, year, quarter)
+    )
+"""
+
+CLEAR_ANOMALIES_SQL = "DELETE FROM anomalies WHERE metric = %s"
+
+INSERT_ANOMALY_SQL = """
+    INSERT INTO anomalies (metric, district, year, quarter, direction, value, expected, z_score)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+# ==============================================================================
+# DETECTION (whole-array operations on a district x quarter cube)
+# ==============================================================================
+def _nanmedian(values, axis):
+    """np.nanmedian without the warning for rows/columns that are all NaN"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmedian(values, axis=axis, keepdims=True)
+
+
+def seasonal_residuals(values, season=SEASON):
+    """
+    Log change against `season` quarters earlier, minus the cross-district median
+    change of the quarter. Returns (residuals, baseline) where baseline is the log
+    value the residual is measured from; both are shaped like values.
+    """
+    # Pulse reports 0 where it has no data (e.g. app opens before 2019), so 0 counts as missing
+    logs = np.log1p(np.where(values > 0, values, np.nan))
+    lagged = np.full_like(logs, np.nan)
+    if season < logs.shape[1]:
+        lagged[:, season:] = logs[:, :-season]
+    change = logs - lagged
+    common = _nanmedian(change, axis=0)
+    return change - common, lagged + common
+
+
+def robust_z(residuals, min_history=MIN_HISTORY):
+    """Modified z-score of every residual against its row's median and MAD"""
+    center = _nanmedian(residuals, axis=1)
+    mad = np.fmax(_nanmedian(np.abs(residuals - center), axis=1), MIN_MAD)
+    history = np.sum(np.isfinite(residuals), axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = MAD_SCALE * (residuals - center) / mad
+    z[~np.isfinite(z) | (history < min_history)] = np.nan
+    return z, center
+
+
+def detect(cube, threshold=THRESHOLD):
+    """
+    Rows (district, year, quarter, direction, value, expected, z_score) for every
+    cell of the cube whose |z| reaches the threshold, largest |z| first.
+    """
+    if cube.values.size == 0:
+        return []
+    residuals, baseline = seasonal_residuals(cube.values)
+    z, center = robust_z(residuals)
+    # Value the district's usual seasonal change would have given
+    expected = np.expm1(baseline + center)
+
+    with np.errstate(invalid="ignore"):
+        flagged = np.abs(z) >= threshold
+    rows, cols = np.nonzero(flagged)
+    order = np.argsort(-np.abs(z[rows, cols]), kind="stable")
+    rows, cols = rows[order], cols[order]
+    return [
+        (str(cube.entities[r]), cube.periods[c][0], cube.periods[c][1],
+         "spike" if z[r, c] > 0 else "collapse",
+         float(cube.values[r, c]), float(expected[r, c]), float(z[r, c]))
+        for r, c in zip(rows, cols)
+    ]
+
+
+# ==============================================================================
+# MATERIALIZE
+# ==============================================================================
+def metrics_for(tables):
+    """Metrics computed from any of the given tables"""
+    return [metric for metric in METRICS if SOURCE_TABLES[metric] in tables]
+
+
+def refresh_anomalies(conn, metrics=None, threshold=THRESHOLD):
+    """
+    Recompute the given metrics (all if None) and replace their rows, one
+    transaction per metric; failures only print. Returns {metric: anomalies found}.
+    """
+    found = {}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ANOMALIES_TABLE_SQL)
+        for metric in metrics or METRICS:
+            rows = detect(load_cube(conn, metric, "district"), threshold)
+            cursor.execute(CLEAR_ANOMALIES_SQL, (metric,))
+            if rows:
+                cursor.executemany(INSERT_ANOMALY_SQL, [(metric,) + row for row in rows])
+            log_change(cursor, "anomalies", "anomalies")
+            conn.commit()
+            found[metric] = len(rows)
+    except Exception as e:
+        conn.rollback()
+        print(f"Could not refresh anomalies: {e}")
+    finally:
+        cursor.close()
+    return found
+
+
+if __name__ == "__main__":
+    from ingest_common import connect
+    from change_feed import CHANGES_TABLE_SQL
+
+    parser = argparse.ArgumentParser(description="Flag district spikes and collapses into the anomalies table")
+    parser.add_argument("metrics", nargs="*", help=f"metrics to recompute (default: all of {', '.join(METRICS)})")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"minimum |robust z-score| (default: {THRESHOLD})")
+    args = parser.parse_args()
+    unknown = [m for m in args.metrics if m not in METRICS]
+    if unknown:
+        parser.error(f"unknown metric(s): {', '.join(unknown)}")
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(CHANGES_TABLE_SQL)
+    cursor.close()
+    for metric, count in refresh_anomalies(conn, args.metrics, args.threshold).items():
+        print(f"{metric}: {count} anomalies")
+    conn.close()
@@ -0,0 +1,380 @@
+"""
+Read-only HTTP JSON API serving the numbers the dashboard shows.
+- Same SQL as the dashboard (dashboard_queries.py); filters take the sidebar's
+  values and default to them (latest year, "All States", ...)
+- Responses are gzip- or brotli-compressed (brotli needs the brotli package)
+  following Accept-Encoding
+- ETags are derived from the ingestion version (ingest_common.ingestion_version,
+  the latest ingest_changes id), so a client sending If-None-Match gets 304
+  until the next load commits. Without a change feed there is no version:
+  responses then carry no ETag and nothing is cached
+- Each connection gets a lightweight thread (idle keep-alive clients only hold
+  that); the query and encoding work runs on a fixed pool of worker threads
+  sharing a pool of database connections of the same size. Encoded bodies are
+  cached per ingestion version
+- --standin serves a SQLite copy of data/ (standin_db.py) instead of MySQL
+
+Endpoints (GET or HEAD):
+    /api/filters                                      years, states, transaction types
+    /api/metrics?year=&state=&quarter=&type=          key metrics
+    /api/quarterly?year=&state=&quarter=&type=        quarterly transaction trend
+    /api/transaction-types?year=
+    /api/top-states?year=&n=                          by transaction count
+    /api/user-states?year=&n=                         by registered users
+    /api/devices?year=&n=                             device brands
+    /api/insurance-states?year=&n=
+    /api/insurance-quarterly?year=
+
+Usage:
+    python api_server.py --port 8502 --workers 8
+    python api_server.py --standin
+    curl -H "Accept-Encoding: gzip" "localhost:8502/api/metrics?year=2023&state=Karnataka"
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import dashboard_queries
+import db_pool
+import filter_options
+from frame_loader import read_frame
+from ingest_common import connect, ingestion_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+VERSION_TTL = 2.0        # seconds the ingestion version is reused before asking the database again
+BODY_CACHE_ENTRIES = 1024
+MIN_COMPRESS_BYTES = 256  # smaller bodies are sent as they are
+MAX_TOP_N = 100
+
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+
+# Endpoint -> (filters it takes, function(filters) -> SQL)
+TABLE_ENDPOINTS = {
+    "quarterly": (("year", "state", "quarter", "type"),
+                  lambda f: dashboard_queries.quarterly_sql(f["year"], f["state"], f["quarter"], f["type"])),
+    "transaction-types": (("year",), lambda f: dashboard_queries.types_sql(f["year"])),
+    "top-states": (("year", "n"), lambda f: dashboard_queries.states_sql(f["year"], f["n"])),
+    "user-states": (("year", "n"), lambda f: dashboard_queries.user_states_sql(f["year"], f["n"])),
+    "devices": (("year", "n"), lambda f: dashboard_queries.devices_sql(f["year"], f["n"])),
+    "insurance-states": (("year", "n"), lambda f: dashboard_queries.insurance_states_sql(f["year"], f["n"])),
+    "insurance-quarterly": (("year",), lambda f: dashboard_queries.insurance_quarterly_sql(f["year"])),
+}
+METRIC_FILTERS = ("year", "state", "quarter", "type")
+
+
+class BadRequest(Exception):
+    """A filter value the sidebar would not offer"""
+
+
+def choose_encoding(accept_encoding):
+    """Best supported content coding of an Accept-Encoding header: "br", "gzip" or None"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def compress(body, coding):
+    if coding == "br":
+        return brotli.compress(body, quality=5)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def frame_table(df):
+    """{"columns": [...], "rows": [[...]]} with NULL/NaN as null"""
+    split = json.loads(df.to_json(orient="split", index=False))
+    return {"columns": split["columns"], "rows": split["data"]}
+
+
+class AggregateApi:
+    """Query logic and caches shared by every worker thread"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.lock = threading.Lock()
+        self._version = None
+        self._version_at = None
+        self._options = {}  # version -> filter options
+        self.bodies = OrderedDict()  # (version, canonical request, coding) -> bytes
+
+    def version(self):
+        """Ingestion version (None without a change feed), refreshed at most every VERSION_TTL seconds"""
+        with self.lock:
+            if self._version_at is not None and time.monotonic() - self._version_at < VERSION_TTL:
+                return self._version
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                version = ingestion_version(cursor)
+            finally:
+                cursor.close()
+        with self.lock:
+            self._version, self._version_at = version, time.monotonic()
+        return version
+
+    def options(self, version):
+        """Years, states and transaction types of the loaded data"""
+        with self.lock:
+            if version in self._options:
+                return self._options[version]
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                options = filter_options.build_options(cursor)
+            finally:
+                cursor.close()
+        if version is not None:
+            with self.lock:
+                self._options = {version: options}
+        return options
+
+    def filters(self, version, names, query):
+        """Validated filter values (sidebar defaults for missing ones); raises BadRequest"""
+        options = self.options(version)
+        unknown = set(query) - set(names)
+        if unknown:
+            raise BadRequest(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+        values = {}
+        for name in names:
+            value = query.get(name, [None])[-1]
+            if name == "year":
+                if not options["years"]:
+                    raise BadRequest("no data loaded")
+                try:
+                    values[name] = int(value) if value is not None else options["years"][0]
+                except ValueError:
+                    raise BadRequest(f"year must be a number, got {value!r}")
+                if values[name] not in options["years"]:
+                    raise BadRequest(f"no data for year {values[name]}")
+            elif name == "state":
+                values[name] = value or dashboard_queries.ALL_STATES
+                if values[name] not in options["states"] + [dashboard_queries.ALL_STATES]:
+                    raise BadRequest(f"unknown state {value!r}")
+            elif name == "quarter":
+                values[name] = value or dashboard_queries.ALL_QUARTERS
+                if values[name] not in QUARTERS + [dashboard_queries.ALL_QUARTERS]:
+                    raise BadRequest(f"quarter must be one of Q1..Q4, got {value!r}")
+            elif name == "type":
+                values[name] = value or dashboard_queries.ALL_TYPES
+                if values[name] not in options["types"] + [dashboard_queries.ALL_TYPES]:
+                    raise BadRequest(f"unknown transaction type {value!r}")
+            elif name == "n":
+                try:
+                    values[name] = int(value) if value is not None else 10
+                except ValueError:
+                    raise BadRequest(f"n must be a number, got {value!r}")
+                if not 1 <= values[name] <= MAX_TOP_N:
+                    raise BadRequest(f"n must be between 1 and {MAX_TOP_N}")
+        return values
+
+    def _frame(self, sql):
+        with self.pool.connection() as conn:
+            return read_frame(sql, conn)
+
+    def payload(self, version, endpoint, query):
+        """(filters, payload dict) of an endpoint; raises KeyError for unknown endpoints"""
+        if endpoint == "filters":
+            self.filters(version, (), query)
+            options = self.options(version)
+            return {}, {name: options[name] for name in ("years", "states", "types")}
+        if endpoint == "metrics":
+            f = self.filters(version, METRIC_FILTERS, query)
+            args = (f["year"], f["state"], f["quarter"], f["type"])
+            txn = frame_table(self._frame(dashboard_queries.txn_metrics_sql(*args)))
+            users = frame_table(self._frame(dashboard_queries.user_metrics_sql(*args)))
+            metrics = {}
+            for table in (txn, users):
+                metrics.update(zip(table["columns"], table["rows"][0] if table["rows"] else []))
+            return f, {"metrics": metrics}
+        names, build_sql = TABLE_ENDPOINTS[endpoint]
+        f = self.filters(version, names, query)
+        return f, frame_table(self._frame(build_sql(f)))
+
+    def respond(self, endpoint, query, client_tags, coding):
+        """(etag, body, coding) of a request; body is None when the client's copy is current"""
+        version = self.version()
+        etag = make_etag(version, endpoint, query)
+        if etag is not None and (etag in client_tags or "*" in client_tags):
+            return etag, None, None
+        body, coding = self.body(version, endpoint, query, coding)
+        return etag, body, coding
+
+    def body(self, version, endpoint, query, coding):
+        """(canonical request key, encoded body), from the cache when possible"""
+        key = (version, endpoint, tuple(sorted((k, tuple(v)) for k, v in query.items())), coding)
+        with self.lock:
+            if version is not None and key in self.bodies:
+                self.bodies.move_to_end(key)
+                return self.bodies[key]
+        filters, payload = self.payload(version, endpoint, query)
+        raw = json.dumps({"version": version, "filters": filters, **payload},
+                         separators=(",", ":")).encode("utf-8")
+        encoded = compress(raw, coding) if len(raw) >= MIN_COMPRESS_BYTES else raw
+        result = (encoded, coding if encoded is not raw else None)
+        if version is not None:  # unversioned bodies could never be invalidated
+            with self.lock:
+                self.bodies[key] = result
+                while len(self.bodies) > BODY_CACHE_ENTRIES:
+                    self.bodies.popitem(last=False)
+        return result
+
+
+def make_etag(version, endpoint, query):
+    """Weak ETag: same ingestion version and request -> same tag, whatever the coding; None without a version"""
+    if version is None:
+        return None
+    canonical = json.dumps([version, endpoint, sorted((k, v) for k, v in query.items())])
+    return 'W/"' + hashlib.blake2b(canonical.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 10  # idle keep-alive connections are closed after this many seconds
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        api = self.server.api
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        endpoint = url.path.rstrip("/")
+        if not endpoint.startswith("/api/"):
+            return self.send_json(404, {"error": f"unknown path {url.path}"}, send_body)
+        endpoint = endpoint[len("/api/"):]
+        if endpoint not in TABLE_ENDPOINTS and endpoint not in ("filters", "metrics"):
+            return self.send_json(404, {"error": f"unknown endpoint {endpoint}"}, send_body)
+
+        client_tags = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+        coding = choose_encoding(self.headers.get("Accept-Encoding"))
+        try:
+            # Only this part holds a worker (and a database connection)
+            etag, body, coding = self.server.executor.submit(
+                api.respond, endpoint, query, client_tags, coding
+            ).result()
+        except BadRequest as e:
+            return self.send_json(400, {"error": str(e)}, send_body)
+        except Exception as e:
+            self.log_error("query failed for %s: %s", self.path, e)
+            return self.send_json(500, {"error": "query failed"}, send_body)
+
+        if body is None:
+            self.send_response(304)
+            self.send_common_headers(etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_common_headers(etag)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_common_headers(self, etag):
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")  # revalidate every time, cheap with 304s
+        self.send_header("Vary", "Accept-Encoding")
+
+    def send_json(self, status, payload, send_body=True):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """
+    One thread per connection for reading requests and writing responses; handlers
+    run the query and encoding work on a fixed pool of workers (self.executor)
+    """
+    daemon_threads = True
+
+    def __init__(self, address, handler, api, workers, verbose=False):
+        super().__init__(address, handler)
+        self.api = api
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def make_server(host="127.0.0.1", port=8502, workers=8, standin=None, verbose=False):
+    """Server bound to host:port, reading MySQL or the SQLite stand-in at `standin`"""
+    if standin:
+        import standin_db
+        factory = partial(standin_db.connect_standin, standin)
+    else:
+        factory = connect
+    api = AggregateApi(db_pool.ConnectionPool(factory, size=workers))
+    return PooledHTTPServer((host, port), ApiHandler, api, workers, verbose)
+
+
+if __name__ == "__main__":
+    import standin_db
+
+    parser = argparse.ArgumentParser(description="Serve the dashboard's numbers as a read-only JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8502, help="port to listen on (default: 8502)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="worker threads and database connections (default: 8)")
+    parser.add_argument("--standin", nargs="?", const=standin_db.STANDIN_PATH,
+                        help="serve a SQLite stand-in built from data/ instead of MySQL")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    if args.standin and not os.path.exists(args.standin):
+        print(f"Building the stand-in database at {args.standin}")
+        standin_db.build_standin(args.standin)
+    server = make_server(args.host, args.port, max(1, args.workers), args.standin, args.verbose)
+    print(f"Serving on http://{args.host}:{args.port}/api/ with {max(1, args.workers)} workers"
+          f"{' (brotli off: pip install brotli)' if brotli is None else ''}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
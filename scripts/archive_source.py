@@ -0,0 +1,94 @@
+"""
+Read PhonePe Pulse JSON files straight out of an archive of the data/ tree.
+- Supports .zip, .tar, .tar.gz/.tgz, .tar.bz2, .tar.xz and .tar.zst (needs `zstandard`)
+- Members are streamed in archive order; nothing is extracted to disk
+- Member paths are dispatched to loaders with the same
+  <base_dir>/<state>/<year>/<quarter>.json layout the directory walk uses
+
+Create an archive from the repo root with e.g.:
+    tar --zstd -cf pulse.tar.zst data
+"""
+import re
+import tarfile
+import zipfile
+
+
+def _member_pattern(base_dir):
+    """Regex matching <anything>/<base_dir>/<state>/<year>/<quarter>.json"""
+    return re.compile(r"(?:^|/)" + re.escape(base_dir) + r"/([^/]+)/(\d{4})/([^/]+\.json)$")
+
+
+def match_member(name, datasets):
+    """
+    Find which dataset an archive member belongs to.
+    Returns (dataset, state, year, quarter, rel_path) or None for unrelated members.
+    """
+    name = name.replace("\\", "/")
+    for dataset, pattern in datasets:
+        match = pattern.search(name)
+        if not match:
+            continue
+        state, year, file = match.groups()
+        try:
+            quarter = int(file.replace(".json", ""))
+        except ValueError:
+            print(f"Skipping invalid file: {name}")
+            return None
+        rel_path = f"{dataset.base_dir}/{state}/{year}/{file}"
+        return dataset, state, int(year), quarter, rel_path
+    return None
+
+
+def _open_tar_stream(archive_path):
+    """Open a tar archive for sequential (non-seeking) reading"""
+    if archive_path.endswith((".zst", ".zstd")):
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("Reading .tar.zst archives needs zstandard: pip install zstandard")
+        raw = open(archive_path, "rb")
+        stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        tar = tarfile.open(fileobj=stream, mode="r|")
+        return tar, (stream, raw)
+    # "r|*" detects gzip/bz2/xz compression on the fly
+    return tarfile.open(archive_path, mode="r|*"), ()
+
+
+def iter_members(archive_path):
+    """
+    Yield (member_name, read) for every regular file in the archive, in storage order.
+    read() returns the member's bytes; call it before advancing to the next member.
+    """
+    if archive_path.endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as zf:
+            # Central directory order matches the on-disk order of the members
+            for info in sorted(zf.infolist(), key=lambda i: i.header_offset):
+                if info.is_dir():
+                    continue
+                yield info.filename, (lambda info=info: zf.read(info))
+        return
+
+    tar, extra = _open_tar_stream(archive_path)
+    try:
+        for member in tar:
+            if not member.isfile():
+                continue
+            yield member.name, (lambda member=member: tar.extractfile(member).read())
+    finally:
+        tar.close()
+        for handle in extra:
+            handle.close()
+
+
+def iter_archive_files(archive_path, datasets):
+    """
+    Yield (dataset, state, year, quarter, rel_path, read) for each archive member
+    that belongs to one of the given datasets. Other members are skipped.
+    """
+    patterns = [(dataset, _member_pattern(dataset.base_dir)) for dataset in datasets]
+    for name, read in iter_members(archive_path):
+        matched = match_member(name, patterns)
+        if matched is None:
+            continue
+        dataset, state, year, quarter, rel_path = matched
+        yield dataset, state, year, quarter, rel_path, read
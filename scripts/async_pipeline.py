@@ -0,0 +1,467 @@
+"""
+Asyncio ingestion pipeline: an alternative to running the load_*.py scripts one by one.
+- Scans the data tree asynchronously for every selected dataset
+- Prefetches file bytes into a bounded queue
+- Parses JSON on a process pool using each loader's parse function
+- Writes rows with aiomysql; each file is committed with its checkpoint row,
+  its ingest_changes entry and (map_* files) its district_facts upsert.
+  Writers upsert the same district_facts rows concurrently, so a file that
+  hits a deadlock or lock wait timeout is retried with backoff. A writer whose
+  rollback fails reconnects, or fails its remaining files if it cannot
+- Bounded queues between stages give backpressure, so read, parse and write overlap
+- Files unchanged since the last run skip the parsers: their rows come from
+  the parsed-file cache (parse_cache.py; --parse-cache-mb 0 turns it off)
+- Validates each file's rows as they leave the parsers (validation.py) and
+  prints the violations report at the end
+- Refreshes the filter options, district anomalies and search index of the loaded tables when done,
+  the insurance heatmap bins when map_insurance was loaded, and the dashboard's top-K index
+  and shared cache
+- Prints the depth of every queue while it runs; exits with status 1 if any file failed
+- With --archive, one sequential read of a .zip/.tar[.zst] replaces the scan and read stages
+
+Usage:
+    python async_pipeline.py                       # all datasets
+    python async_pipeline.py map_transaction map_user --writers 8 --resume
+    python async_pipeline.py --archive pulse.tar.zst
+"""
+import os
+import sys
+import time
+import random
+import json
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pymysql
+
+from ingest_common import (
+    DB_CONFIG, DATA_ROOT, CHECKPOINT_TABLE_SQL, COMPLETED_FILES_SQL,
+    MARK_DONE_SQL, read_file, reset_statements, target_table, connect,
+)
+import anomalies
+import build_insurance_heatmap
+import district_facts
+import filter_options
+import parse_cache
+import search_index
+import shared_cache
+import topk_index
+from change_feed import CHANGES_TABLE_SQL, LOG_CHANGE_SQL
+from datasets import DATASETS, get_datasets
+from archive_source import iter_archive_files
+from validation import (
+    StreamValidator, TOTALS_TABLE_SQL, LOAD_TOTALS_SQL, SAVE_TOTALS_SQL, seed_datasets,
+)
+
+STOP = None  # sentinel that tells the next stage to finish
+
+# MySQL errors after which a file's transaction is simply run again:
+# 1213 deadlock, 1205 lock wait timeout (concurrent district_facts upserts)
+RETRY_ERRORS = {1213, 1205}
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.05  # seconds, doubled on every attempt (plus jitter)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load PhonePe Pulse data with an asyncio pipeline")
+    parser.add_argument("datasets", nargs="*",
+                        help=f"datasets to load (default: all). Choices: {', '.join(DATASETS)}")
+    parser.add_argument("--data-root", default=DATA_ROOT,
+                        help="path to the PhonePe Pulse data/ directory")
+    parser.add_argument("--archive",
+                        help="read from a .zip/.tar[.gz|.zst] of the data tree instead of --data-root")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip files already committed by a previous run")
+    parser.add_argument("--readers", type=int, default=8,
+                        help="concurrent file reads (default: 8)")
+    parser.add_argument("--parsers", type=int, default=os.cpu_count() or 2,
+                        help="parser processes (default: number of CPUs)")
+    parser.add_argument("--writers", type=int, default=4,
+                        help="concurrent database connections (default: 4)")
+    parser.add_argument("--prefetch", type=int, default=64,
+                        help="max files held in each queue between stages (default: 64)")
+    parser.add_argument("--report-interval", type=float, default=2.0,
+                        help="seconds between queue depth reports, 0 to disable (default: 2)")
+    parser.add_argument("--report",
+                        help="also write the validation report as JSON to this path")
+    parser.add_argument("--parse-cache-mb", type=int, default=parse_cache.DEFAULT_MAX_MB,
+                        help=f"size limit of the parsed-file cache, 0 to disable "
+                             f"(default: {parse_cache.DEFAULT_MAX_MB})")
+    return parser.parse_args(argv)
+
+
+# ==============================================================================
+# STAGE HELPERS
+# ==============================================================================
+def parse_file(dataset_name, raw, state, year, quarter):
+    """Decode one file and turn it into rows; runs in a worker process"""
+    content = json.loads(raw)
+    return DATASETS[dataset_name].parse(content, state, year, quarter)
+
+
+def list_dir(path):
+    """Sorted directory listing (empty if the path is not a directory)"""
+    if not os.path.isdir(path):
+        return []
+    return sorted(os.listdir(path))
+
+
+class Stats:
+    """Counters shared by all stages"""
+
+    def __init__(self):
+        self.scanned = 0
+        self.skipped = 0
+        self.read = 0
+        self.parsed = 0
+        self.cached = 0
+        self.retried = 0
+        self.written = 0
+        self.failed = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"scanned={self.scanned} skipped={self.skipped} read={self.read} "
+                f"parsed={self.parsed} cached={self.cached} written={self.written} "
+                f"retried={self.retried} failed={self.failed} "
+                f"rows={self.rows} elapsed={elapsed:.1f}s")
+
+
+# ==============================================================================
+# STAGES
+# ==============================================================================
+async def scan(datasets, data_root, done, path_q, stats):
+    """Walk <state>/<year>/<quarter>.json for each dataset without blocking the loop"""
+    for dataset in datasets:
+        base_path = os.path.join(data_root, *dataset.base_dir.split("/"))
+        for state in await asyncio.to_thread(list_dir, base_path):
+            state_path = os.path.join(base_path, state)
+            for year in await asyncio.to_thread(list_dir, state_path):
+                if not year.isdigit():
+                    continue
+                year_path = os.path.join(state_path, year)
+                for file in await asyncio.to_thread(list_dir, year_path):
+                    if not file.endswith(".json"):
+                        continue  # Skip non-JSON files
+                    try:
+                        quarter = int(file.replace(".json", ""))
+                    except ValueError:
+                        print(f"Skipping invalid file: {file}")
+                        continue
+
+                    stats.scanned += 1
+                    rel_path = f"{dataset.base_dir}/{state}/{year}/{file}"
+                    if rel_path in done[dataset.name]:
+                        stats.skipped += 1
+                        continue
+                    item = (dataset.name, state, int(year), quarter,
+                            os.path.join(year_path, file), rel_path)
+                    await path_q.put(item)  # waits while readers are behind
+
+
+async def scan_archive(datasets, archive, done, bytes_q, stats):
+    """
+    Stream archive members in a thread and feed their bytes straight to the parsers.
+    The thread blocks on the bounded queue, so the archive is never read far ahead.
+    """
+    loop = asyncio.get_running_loop()
+
+    def produce():
+        for dataset, state, year, quarter, rel_path, read in iter_archive_files(archive, datasets):
+            stats.scanned += 1
+            if rel_path in done[dataset.name]:
+                stats.skipped += 1
+                continue
+            try:
+                raw = read()
+            except Exception as e:
+                print(f"Error reading {rel_path}: {e}")
+                stats.failed += 1
+                continue
+            stats.read += 1
+            item = (dataset.name, state, year, quarter, rel_path, raw)
+            asyncio.run_coroutine_threadsafe(bytes_q.put(item), loop).result()
+
+    await asyncio.to_thread(produce)
+
+
+async def reader(path_q, bytes_q, stats):
+    """Prefetch file bytes into the bounded bytes queue"""
+    while True:
+        item = await path_q.get()
+        if item is STOP:
+            return
+        name, state, year, quarter, file_path, rel_path = item
+        try:
+            raw = await asyncio.to_thread(read_file, file_path)
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+            stats.failed += 1
+            continue
+        stats.read += 1
+        await bytes_q.put((name, state, year, quarter, rel_path, raw))
+
+
+async def parser(bytes_q, rows_q, pool, caches, validator, claimed, stats):
+    """
+    Hand raw bytes to the process pool (unless the parse cache has the file's rows),
+    validate the parsed rows and queue them. A file already claimed in this run
+    (e.g. a duplicate archive member) is reported and dropped
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await bytes_q.get()
+        if item is STOP:
+            return
+        name, state, year, quarter, rel_path, raw = item
+        cache = caches.get(name)
+        rows = cache.get(rel_path, raw) if cache is not None else None
+        if rows is not None:
+            stats.cached += 1
+        else:
+            try:
+                rows = await loop.run_in_executor(pool, parse_file, name, raw, state, year, quarter)
+            except Exception as e:
+                print(f"Error parsing {rel_path}: {e}")
+                stats.failed += 1
+                continue
+            stats.parsed += 1
+            if cache is not None:
+                cache.put(rel_path, raw, rows)
+        # Runs on the event loop, so the claim and the validator need no locking
+        if rel_path in claimed[name]:
+            validator.duplicate_partition(name, rel_path)
+            continue
+        claimed[name].add(rel_path)  # released by the writer if the file's write fails
+        rows, totals = validator.check(name, state, year, quarter, rel_path, rows)
+        await rows_q.put((name, state, year, quarter, rel_path, rows, totals))
+
+
+def is_retryable(error):
+    """True for deadlocks and lock wait timeouts"""
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and error.args[0] in RETRY_ERRORS
+
+
+async def write_file(conn, cursor, name, state, year, quarter, rel_path, rows, totals):
+    """Insert the rows of one file and its checkpoint in a single transaction"""
+    has_facts = name in district_facts.FACT_COLUMNS
+    if rows:
+        await cursor.executemany(DATASETS[name].insert_sql, rows)
+    if rows and has_facts:
+        await cursor.executemany(district_facts.upsert_sql(name),
+                                 district_facts.fact_rows(name, state, rows))
+    if totals:
+        await cursor.execute(SAVE_TOTALS_SQL, totals)
+    await cursor.execute(MARK_DONE_SQL, (name, rel_path, len(rows)))
+    if rows:
+        await cursor.execute(LOG_CHANGE_SQL, (name, target_table(DATASETS[name]),
+                                              state, year, quarter))
+    if rows and has_facts:
+        await cursor.execute(LOG_CHANGE_SQL, (name, district_facts.TABLE,
+                                              state, year, quarter))
+    await conn.commit()
+
+
+async def write_rows(conn, cursor, rows_q, claimed, stats):
+    """
+    Write files from the rows queue, retrying deadlocked transactions. Returns True at
+    STOP, False when a rollback fails (the connection is closed and the file counted failed).
+    """
+    while True:
+        item = await rows_q.get()
+        if item is STOP:
+            return True
+        name, state, year, quarter, rel_path, rows, totals = item
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                await write_file(conn, cursor, *item)
+            except Exception as e:
+                try:
+                    await conn.rollback()
+                except Exception as rollback_error:
+                    print(f"Insert failed for {rel_path}: {e} (rollback failed: {rollback_error})")
+                    claimed[name].discard(rel_path)
+                    stats.failed += 1
+                    conn.close()  # the pool drops closed connections
+                    return False
+                if attempt < MAX_RETRIES and is_retryable(e):
+                    stats.retried += 1
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt * (1 + random.random()))
+                    continue
+                print(f"Insert failed for {rel_path}: {e}")
+                claimed[name].discard(rel_path)
+                stats.failed += 1
+            else:
+                stats.written += 1
+                stats.rows += len(rows)
+            break
+
+
+async def fail_rows(rows_q, claimed, stats):
+    """Count every file up to STOP as failed, so the parsers never block on a full rows queue"""
+    while True:
+        item = await rows_q.get()
+        if item is STOP:
+            return
+        name, rel_path = item[0], item[4]
+        claimed[name].discard(rel_path)
+        stats.failed += 1
+
+
+async def writer(db_pool, rows_q, claimed, stats):
+    """Write files on one connection, reconnecting after a failed rollback"""
+    while True:
+        try:
+            async with db_pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    if await write_rows(conn, cursor, rows_q, claimed, stats):
+                        return
+        except Exception as e:
+            print(f"Writer lost its connection, failing its remaining files: {e}")
+            await fail_rows(rows_q, claimed, stats)
+            return
+        print("Writer reconnecting")
+
+
+async def report(queues, stats, interval):
+    """Print per-stage queue depths until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        depths = " ".join(f"{name}={q.qsize()}/{q.maxsize}" for name, q in queues.items())
+        print(f"[pipeline] queues: {depths} | {stats.summary()}")
+
+
+# ==============================================================================
+# ORCHESTRATION
+# ==============================================================================
+async def prepare_checkpoints(db_pool, datasets, resume, validator):
+    """
+    Create the checkpoint, totals and district fact tables, reset (progress and rows) or, with
+    --resume, load progress for each dataset, and seed the validator with saved totals of
+    counterparts not loaded in this run
+    """
+    done = {}
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(CHECKPOINT_TABLE_SQL)
+            await cursor.execute(TOTALS_TABLE_SQL)
+            await cursor.execute(CHANGES_TABLE_SQL)
+            if any(dataset.name in district_facts.FACT_COLUMNS for dataset in datasets):
+                await cursor.execute(district_facts.FACTS_TABLE_SQL)
+            for dataset in datasets:
+                if not resume:
+                    for sql, params in reset_statements(dataset):
+                        await cursor.execute(sql, params)
+                await cursor.execute(COMPLETED_FILES_SQL, (dataset.name,))
+                done[dataset.name] = {row[0] for row in await cursor.fetchall()}
+            for other in seed_datasets([dataset.name for dataset in datasets]):
+                await cursor.execute(LOAD_TOTALS_SQL, (other,))
+                validator.seed(other, await cursor.fetchall())
+        await conn.commit()
+    return done
+
+
+async def run_pipeline(args):
+    try:
+        import aiomysql
+    except ImportError:
+        raise SystemExit("The async pipeline needs aiomysql: pip install aiomysql")
+
+    datasets = get_datasets(args.datasets)
+    readers = max(1, args.readers)
+    parsers = max(1, args.parsers)
+    writers = max(1, args.writers)
+    prefetch = max(1, args.prefetch)
+
+    db_pool = await aiomysql.create_pool(
+        host=DB_CONFIG["host"], user=DB_CONFIG["user"], password=DB_CONFIG["password"],
+        db=DB_CONFIG["database"], minsize=1, maxsize=writers + 1, autocommit=False,
+    )
+    stats = Stats()
+    validator = StreamValidator()
+    caches = {}
+    if args.parse_cache_mb > 0:
+        caches = {dataset.name: parse_cache.ParseCache(dataset, max_mb=args.parse_cache_mb)
+                  for dataset in datasets}
+    queues = {
+        "paths": asyncio.Queue(maxsize=prefetch),
+        "bytes": asyncio.Queue(maxsize=prefetch),
+        "rows": asyncio.Queue(maxsize=prefetch),
+    }
+
+    try:
+        done = await prepare_checkpoints(db_pool, datasets, args.resume, validator)
+        # Files committed earlier or taken by a parser in this run; the scan only skips `done`
+        claimed = {name: set(paths) for name, paths in done.items()}
+
+        reporter = None
+        if args.report_interval > 0:
+            reporter = asyncio.create_task(report(queues, stats, args.report_interval))
+
+        with ProcessPoolExecutor(max_workers=parsers) as pool:
+            if args.archive:
+                reader_tasks = []
+            else:
+                reader_tasks = [asyncio.create_task(reader(queues["paths"], queues["bytes"], stats))
+                                for _ in range(readers)]
+            parser_tasks = [asyncio.create_task(parser(queues["bytes"], queues["rows"], pool,
+                                                       caches, validator, claimed, stats))
+                            for _ in range(parsers)]
+            writer_tasks = [asyncio.create_task(writer(db_pool, queues["rows"], claimed, stats))
+                            for _ in range(writers)]
+
+            # Shut the stages down in order: each one stops once its input is drained
+            if args.archive:
+                await scan_archive(datasets, args.archive, done, queues["bytes"], stats)
+            else:
+                await scan(datasets, args.data_root, done, queues["paths"], stats)
+            for _ in reader_tasks:
+                await queues["paths"].put(STOP)
+            await asyncio.gather(*reader_tasks)
+            for _ in parser_tasks:
+                await queues["bytes"].put(STOP)
+            await asyncio.gather(*parser_tasks)
+            for _ in writer_tasks:
+                await queues["rows"].put(STOP)
+            await asyncio.gather(*writer_tasks)
+
+        if reporter is not None:
+            reporter.cancel()
+    finally:
+        db_pool.close()
+        await db_pool.wait_closed()
+
+    for name, cache in caches.items():
+        cache.keep(done[name])  # skipped by --resume
+        cache.save()
+
+    loaded_tables = {target_table(dataset) for dataset in datasets}
+    anomaly_metrics = anomalies.metrics_for(loaded_tables)
+    search_tables = loaded_tables.intersection(search_index.SOURCE_TABLES)
+    heatmap = any(dataset.name == build_insurance_heatmap.DATASET for dataset in datasets)
+    conn = connect()
+    if filter_options.SOURCE_TABLE in loaded_tables:
+        filter_options.refresh_options(conn)  # sidebar years/states/types for the dashboard
+    if anomaly_metrics:
+        anomalies.refresh_anomalies(conn, anomaly_metrics)
+    if search_tables:
+        search_index.refresh_index(conn)  # district/pincode names for the sidebar search
+    if heatmap:
+        build_insurance_heatmap.refresh_heatmap(conn, args.data_root, args.archive)
+    topk_index.refresh_index(conn)  # ranking charts' top-K lists, every table feeds one
+    shared_cache.refresh_shared_cache(conn)  # memory-mapped tables/cubes for dashboard workers
+    conn.close()
+
+    print(f"[pipeline] done: {stats.summary()}")
+    validator.print_report()
+    if args.report:
+        validator.save_report(args.report)
+    return stats
+
+
+if __name__ == "__main__":
+    stats = asyncio.run(run_pipeline(parse_args()))
+    sys.exit(1 if stats.failed else 0)
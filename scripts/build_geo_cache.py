@@ -0,0 +1,176 @@
+"""
+Script to build the compact map geometry used by the dashboard's Map tab.
+- Reads a state-level (and optionally a district-level) GeoJSON file or URL
+- Simplifies every ring with Douglas-Peucker and rounds coordinates
+- Keeps only a normalised join key and display name per feature
+- Writes Streamlit_Dashboard/geo/india_states.min.geojson (and india_districts.min.geojson)
+Run it once; the dashboard only ever loads the small cached files.
+
+Usage:
+    python build_geo_cache.py --states india_states.geojson
+    python build_geo_cache.py --states <url> --districts india_districts.geojson \
+        --district-prop district --district-state-prop st_nm
+"""
+import os
+import json
+import argparse
+from urllib.request import urlopen
+
+from name_keys import name_key, district_key
+
+# Commonly used India state boundaries (property "ST_NM")
+DEFAULT_STATES_URL = (
+    "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/"
+    "e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+)
+
+GEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Streamlit_Dashboard", "geo")
+STATES_FILE = "india_states.min.geojson"
+DISTRICTS_FILE = "india_districts.min.geojson"
+
+
+def load_geojson(source):
+    """Load GeoJSON from a local path or an http(s) URL"""
+    if source.startswith(("http://", "https://")):
+        with urlopen(source) as response:
+            return json.load(response)
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ==============================================================================
+# SIMPLIFICATION
+# ==============================================================================
+def _perpendicular_distance(point, start, end):
+    """Distance from point to the line through start and end (planar, in degrees)"""
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    return abs(dy * x - dx * y + x2 * y1 - y2 * x1) / (dx * dx + dy * dy) ** 0.5
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker simplification (iterative, so large rings don't hit the recursion limit)"""
+    if len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            dist = _perpendicular_distance(points[i], points[first], points[last])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_ring(ring, tolerance, precision):
+    """Simplify a closed ring; returns None if it collapses below a triangle"""
+    simplified = simplify_line([tuple(p[:2]) for p in ring], tolerance)
+    rounded = []
+    for x, y in simplified:
+        point = [round(x, precision), round(y, precision)]
+        if not rounded or rounded[-1] != point:
+            rounded.append(point)
+    if len(rounded) < 4:
+        return None
+    if rounded[0] != rounded[-1]:
+        rounded.append(rounded[0])
+    return rounded
+
+
+def simplify_geometry(geometry, tolerance, precision):
+    """Simplify a Polygon or MultiPolygon geometry"""
+    if geometry is None:
+        return None
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return geometry
+
+    result = []
+    for polygon in polygons:
+        rings = [simplify_ring(ring, tolerance, precision) for ring in polygon]
+        if rings and rings[0] is not None:  # Drop polygons whose outer ring vanished
+            result.append([r for r in rings if r is not None])
+    if not result:
+        return None
+    if len(result) == 1:
+        return {"type": "Polygon", "coordinates": result[0]}
+    return {"type": "MultiPolygon", "coordinates": result}
+
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+def compact_features(source, key_fn, name_fn, tolerance, precision):
+    """Return a FeatureCollection that only has id/key/name and simplified geometry"""
+    features = []
+    for feature in source["features"]:
+        props = feature.get("properties") or {}
+        key = key_fn(props)
+        geometry = simplify_geometry(feature.get("geometry"), tolerance, precision)
+        if not key or geometry is None:
+            continue
+        features.append({
+            "type": "Feature",
+            "id": key,
+            "properties": {"key": key, "name": name_fn(props)},
+            "geometry": geometry,
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def write_geojson(collection, file_name):
+    os.makedirs(GEO_DIR, exist_ok=True)
+    path = os.path.join(GEO_DIR, file_name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(collection, f, separators=(",", ":"))
+    size_kb = os.path.getsize(path) / 1024
+    print(f"Wrote {len(collection['features'])} features to {path} ({size_kb:.0f} KB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build simplified map geometry for the dashboard")
+    parser.add_argument("--states", default=DEFAULT_STATES_URL, help="state GeoJSON path or URL")
+    parser.add_argument("--state-prop", default="ST_NM", help="state name property in --states")
+    parser.add_argument("--districts", help="district GeoJSON path or URL (optional)")
+    parser.add_argument("--district-prop", default="district", help="district name property")
+    parser.add_argument("--district-state-prop", default="st_nm", help="state name property in --districts")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="simplification tolerance in degrees (default: 0.01, about 1 km)")
+    parser.add_argument("--precision", type=int, default=3,
+                        help="decimal places kept per coordinate (default: 3)")
+    args = parser.parse_args(argv)
+
+    states = load_geojson(args.states)
+    write_geojson(compact_features(
+        states,
+        key_fn=lambda p: name_key(p.get(args.state_prop)),
+        name_fn=lambda p: p.get(args.state_prop),
+        tolerance=args.tolerance,
+        precision=args.precision,
+    ), STATES_FILE)
+
+    if args.districts:
+        districts = load_geojson(args.districts)
+        write_geojson(compact_features(
+            districts,
+            key_fn=lambda p: district_key(p.get(args.district_state_prop), p.get(args.district_prop)),
+            name_fn=lambda p: p.get(args.district_prop),
+            tolerance=args.tolerance / 2,
+            precision=args.precision,
+        ), DISTRICTS_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Script to pre-bin the country-level insurance heatmap grid into multi-resolution tiles.
+- Reads data/map/insurance/country/india/<year>/<quarter>.json (lat, lng, metric, label points)
+- Bins the points into square cells for each zoom level the dashboard's Detail
+  slider offers (DETAIL_LEVELS), up to the resolution of the source grid
+  (given by its gridLevel)
+- Stores one row per non-empty cell in insurance_heatmap_bins and the file's
+  gridLevel/point count in insurance_heatmap_meta. The source percentiles are
+  not kept: they rank single points, not the summed cells the map colours
+- The dashboard then fetches only the cells for the zoom level it shows
+- Each rebuilt quarter is logged to the ingest_changes feed
+- Rebuilt after every map_insurance load (run_loader and the async pipeline)
+
+Cell size at zoom z is 360 / 2**(z + 4) degrees, so a source grid of gridLevel g
+(cell size 360 / 2**(g + 2), about 0.09 degrees for g = 10) is matched at zoom g - 2.
+
+Rebuild by hand:
+    python build_insurance_heatmap.py
+"""
+import os
+import re
+import json
+import argparse
+import math
+
+from archive_source import iter_members
+from change_feed import CHANGES_TABLE_SQL, log_change
+
+BASE_DIR = "map/insurance/country/india"
+DATASET = "map_insurance"  # loading this dataset rebuilds the bins
+
+# Detail slider of the dashboard's Map tab -> zoom level; only these are built
+DETAIL_LEVELS = {"Country": 4, "Region": 5, "State": 6, "District": 7, "Full Detail": 8}
+MIN_ZOOM = min(DETAIL_LEVELS.values())  # about 1.4 degree cells: a handful of cells per state
+MAX_ZOOM = max(DETAIL_LEVELS.values())
+
+FILE_PATTERN = re.compile(r"(?:^|/)" + re.escape(BASE_DIR) + r"/(\d{4})/(\d+)\.json$")
+
+CREATE_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS insurance_heatmap_meta (
+        year INT NOT NULL,
+        quarter INT NOT NULL,
+        grid_level INT DEFAULT NULL,
+        point_count INT DEFAULT NULL,
+        total_metric DOUBLE DEFAULT NULL,
+        PRIMARY KEY (year, quarter)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS insurance_heatmap_bins (
+        year INT NOT NULL,
+        quarter INT NOT NULL,
+        zoom INT NOT NULL,
+        cell_row INT NOT NULL,
+        cell_col INT NOT NULL,
+        lat DOUBLE DEFAULT NULL,
+        lng DOUBLE DEFAULT NULL,
+        metric DOUBLE DEFAULT NULL,
+        point_count INT DEFAULT NULL,
+        PRIMARY KEY (year, quarter, zoom, cell_row, cell_col)
+    )
+    """,
+]
+
+
+def cell_size(zoom):
+    """Cell edge in degrees for a zoom level"""
+    return 360.0 / 2 ** (zoom + 4)
+
+
+def zoom_levels(grid_level):
+    """Slider zoom levels to build for a source grid, none finer than the source resolution"""
+    max_zoom = max(MIN_ZOOM, min(MAX_ZOOM, int(grid_level) - 2))
+    return list(range(MIN_ZOOM, max_zoom + 1))
+
+
+def bin_points(points, zoom):
+    """
+    Aggregate (lat, lng, metric) points into square cells.
+    Each cell is placed at the metric-weighted centre of its points.
+    Returns a list of (cell_row, cell_col, lat, lng, metric, point_count).
+    """
+    size = cell_size(zoom)
+    cells = {}
+    for lat, lng, metric in points:
+        key = (math.floor(lat / size), math.floor(lng / size))
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0.0, 0.0, 0.0, 0]
+        weight = metric if metric > 0 else 0.0
+        cell[0] += lat * weight
+        cell[1] += lng * weight
+        cell[2] += metric
+        cell[3] += 1
+
+    rows = []
+    for (row, col), (lat_sum, lng_sum, metric, count) in cells.items():
+        if metric > 0:
+            lat, lng = lat_sum / metric, lng_sum / metric
+        else:
+            lat, lng = (row + 0.5) * size, (col + 0.5) * size
+        rows.append((row, col, round(lat, 5), round(lng, 5), metric, count))
+    return rows
+
+
+def parse_grid(content):
+    """Return (grid_level, points) from one heatmap file"""
+    data = content["data"]
+    meta = data.get("meta") or {}
+    grid = data["data"]
+    columns = grid["columns"]
+    lat_i, lng_i, metric_i = columns.index("lat"), columns.index("lng"), columns.index("metric")
+    points = [(row[lat_i], row[lng_i], float(row[metric_i] or 0)) for row in grid["data"]]
+    return meta.get("gridLevel", 10), points
+
+
+def iter_grid_files(data_root, archive=None):
+    """Yield (year, quarter, read) for every heatmap file, from the data tree or an archive"""
+    from ingest_common import read_file
+
+    if archive:
+        for name, read in iter_members(archive):
+            match = FILE_PATTERN.search(name.replace("\\", "/"))
+            if match:
+                yield int(match.group(1)), int(match.group(2)), read
+        return
+
+    base_path = os.path.join(data_root, *BASE_DIR.split("/"))
+    for year in sorted(os.listdir(base_path)):
+        year_path = os.path.join(base_path, year)
+        if not year.isdigit() or not os.path.isdir(year_path):
+            continue  # Skips the state/ folder
+        for file in sorted(os.listdir(year_path)):
+            if not file.endswith(".json"):
+                continue
+            try:
+                quarter = int(file.replace(".json", ""))
+            except ValueError:
+                print(f"Skipping invalid file: {file}")
+                continue
+            file_path = os.path.join(year_path, file)
+            yield int(year), quarter, (lambda file_path=file_path: read_file(file_path))
+
+
+def build_heatmap(conn, data_root, archive=None):
+    """Rebuild the bins and meta row of every quarter, one transaction per quarter; returns quarters built"""
+    cursor = conn.cursor()
+    for sql in CREATE_TABLES_SQL + [CHANGES_TABLE_SQL]:
+        cursor.execute(sql)
+    conn.commit()
+
+    built = 0
+    for year, quarter, read in iter_grid_files(data_root, archive):
+        try:
+            grid_level, points = parse_grid(json.loads(read()))
+        except Exception as e:
+            print(f"Error reading {year}/{quarter}.json: {e}")
+            continue
+
+        # Replace this quarter's bins in one transaction
+        cursor.execute("DELETE FROM insurance_heatmap_bins WHERE year = %s AND quarter = %s", (year, quarter))
+        bin_count = 0
+        zooms = zoom_levels(grid_level)
+        for zoom in zooms:
+            rows = [(year, quarter, zoom) + cell for cell in bin_points(points, zoom)]
+            cursor.executemany("""
+                INSERT INTO insurance_heatmap_bins (
+                    year, quarter, zoom, cell_row, cell_col, lat, lng, metric, point_count
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, rows)
+            bin_count += len(rows)
+
+        cursor.execute("""
+            REPLACE INTO insurance_heatmap_meta (
+                year, quarter, grid_level, point_count, total_metric
+            ) VALUES (%s, %s, %s, %s, %s)
+        """, (year, quarter, grid_level, len(points), sum(p[2] for p in points)))
+        log_change(cursor, "insurance_heatmap", "insurance_heatmap_bins", None, year, quarter)
+        conn.commit()
+        built += 1
+        print(f"{year} Q{quarter}: {len(points)} points -> {bin_count} bins (zoom {zooms[0]}-{zooms[-1]})")
+    cursor.close()
+    return built
+
+
+def refresh_heatmap(conn, data_root, archive=None):
+    """build_heatmap after a load; failures only print (the dashboard shows how to build the bins)"""
+    try:
+        build_heatmap(conn, data_root, archive)
+    except Exception as e:
+        conn.rollback()
+        print(f"Could not rebuild the insurance heatmap bins: {e}")
+
+
+def main(argv=None):
+    from ingest_common import DATA_ROOT, connect
+
+    parser = argparse.ArgumentParser(description="Pre-bin the insurance heatmap grid per zoom level")
+    parser.add_argument("--data-root", default=DATA_ROOT,
+                        help="path to the PhonePe Pulse data/ directory")
+    parser.add_argument("--archive",
+                        help="read from a .zip/.tar[.gz|.zst] of the data tree instead of --data-root")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    build_heatmap(conn, args.data_root, args.archive)
+    conn.close()
+    print("Insurance heatmap bins built successfully.")
+
+
+if __name__ == "__main__":
+    main()
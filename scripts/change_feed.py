@@ -0,0 +1,116 @@
+"""
+Change feed from ingestion to the dashboard.
+- Every loader appends one row per committed file to ingest_changes
+  (table, state, year, quarter), in the same transaction as the file's rows,
+  so a change is visible exactly when its data is
+- TableVersions polls the feed for rows newer than the last one it saw and keeps
+  a version per table; caches keyed by those versions are invalidated only for
+  the tables that changed
+
+Usage:
+    versions = TableVersions()
+    changes = versions.poll(cursor)       # [Change(...), ...] since the last poll
+    key = versions.version(sql)           # (("map_users", 4711),) for a query on map_users
+"""
+import re
+import threading
+from collections import namedtuple
+
+CHANGES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ingest_changes (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        loader VARCHAR(50) NOT NULL,
+        table_name VARCHAR(64) NOT NULL,
+        state VARCHAR(100) DEFAULT NULL,
+        year INT DEFAULT NULL,
+        quarter INT DEFAULT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id),
+        KEY table_name (table_name)
+    )
+"""
+
+LOG_CHANGE_SQL = """
+    INSERT INTO ingest_changes (loader, table_name, state, year, quarter)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+POLL_SQL = """
+    SELECT id, table_name, state, year, quarter, changed_at
+    FROM ingest_changes WHERE id > %s ORDER BY id
+"""
+
+LATEST_SQL = "SELECT table_name, MAX(id), MAX(changed_at) FROM ingest_changes GROUP BY table_name"
+
+Change = namedtuple("Change", ["id", "table", "state", "year", "quarter", "changed_at"])
+
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN|INTO)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def tables_in(sql):
+    """Names of the tables a SQL statement reads from or writes to"""
+    return sorted({name.lower() for name in TABLE_PATTERN.findall(sql)})
+
+
+def latest_versions(cursor):
+    """{table: id of its latest change}; empty if the feed does not exist yet"""
+    try:
+        cursor.execute(LATEST_SQL)
+        return {table: change_id for table, change_id, _ in cursor.fetchall()}
+    except Exception:
+        return {}
+
+
+def log_change(cursor, loader, table, state=None, year=None, quarter=None):
+    """Record that a partition of a table changed; call before the commit that publishes it"""
+    cursor.execute(LOG_CHANGE_SQL, (loader, table, state, year, quarter))
+
+
+class TableVersions:
+    """
+    Latest change id (the table's version) and change time per table.
+    Thread-safe, so one instance can be shared by every dashboard session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_id = None     # None until the first poll
+        self.versions = {}      # table -> id of its latest change
+        self.changed_at = {}    # table -> time of its latest change
+
+    def poll(self, cursor):
+        """
+        Read changes committed since the last poll and return them.
+        The first poll only records the current versions and returns [].
+        """
+        with self._lock:
+            try:
+                if self.last_id is None:
+                    cursor.execute(LATEST_SQL)
+                    rows = cursor.fetchall()
+                    for table, change_id, changed_at in rows:
+                        self.versions[table] = change_id
+                        self.changed_at[table] = changed_at
+                    self.last_id = max((row[1] for row in rows), default=0)
+                    return []
+
+                cursor.execute(POLL_SQL, (self.last_id,))
+                changes = [Change(*row) for row in cursor.fetchall()]
+            except Exception:
+                return []  # No feed yet (tables loaded before it existed)
+
+            for change in changes:
+                self.versions[change.table] = change.id
+                self.changed_at[change.table] = change.changed_at
+            if changes:
+                self.last_id = changes[-1].id
+            return changes
+
+    def version(self, sql):
+        """Cache key part for a query: the version of every table it reads"""
+        return tuple((table, self.versions.get(table, 0)) for table in tables_in(sql))
+
+    def changed_after(self, table, timestamp):
+        """True if the table changed after the given datetime"""
+        changed_at = self.changed_at.get(table)
+        return changed_at is not None and timestamp is not None and changed_at > timestamp
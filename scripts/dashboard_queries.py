@@ -0,0 +1,154 @@
+"""
+SQL behind the dashboard's headline sections, shared by dashboard.py and the
+HTTP API (api_server.py) so both serve the same numbers.
+- Every function takes the sidebar's filter values and returns one SELECT
+- Names follow the snapshot payload parts (snapshots.py) that replace these
+  queries while a snapshot is current
+- Filter values are pasted into the SQL: callers pass values from the sidebar
+  lists only (the API checks them against filter_options first)
+"""
+from district_facts import DISTRICT_LABELS_SQL
+
+ALL_STATES = "All States"
+ALL_QUARTERS = "All Quarters"
+ALL_TYPES = "All Types"
+
+
+def build_where_clause(year, state, quarter, txn_type, table_name="aggregated_transactions"):
+    """Build WHERE clause for SQL queries based on selected filters"""
+    conditions = [f"year = {year}"]
+
+    if state != ALL_STATES:
+        conditions.append(f"state = '{state}'")
+
+    if quarter != ALL_QUARTERS:
+        quarter_num = quarter.replace("Q", "")
+        conditions.append(f"quarter = {quarter_num}")
+
+    if txn_type != ALL_TYPES and table_name == "aggregated_transactions":
+        conditions.append(f"transaction_type = '{txn_type}'")
+
+    return " AND ".join(conditions)
+
+
+# ==============================================================================
+# KEY METRICS / QUARTERLY TREND (all four filters)
+# ==============================================================================
+def txn_metrics_sql(year, state, quarter, txn_type):
+    return f"""
+        SELECT
+            SUM(transaction_count) as total_transactions,
+            SUM(transaction_amount) as total_amount,
+            AVG(transaction_amount/transaction_count) as avg_transaction_value
+        FROM aggregated_transactions
+        WHERE {build_where_clause(year, state, quarter, txn_type)}
+    """
+
+
+def user_metrics_sql(year, state, quarter, txn_type):
+    return f"""
+        SELECT
+            SUM(registered_users) as total_users,
+            SUM(app_opens) as total_app_opens
+        FROM map_users
+        WHERE {build_where_clause(year, state, quarter, txn_type, "map_users")}
+    """
+
+
+def quarterly_sql(year, state, quarter, txn_type):
+    return f"""
+        SELECT
+            quarter,
+            SUM(transaction_count) as transactions,
+            SUM(transaction_amount) as amount
+        FROM aggregated_transactions
+        WHERE {build_where_clause(year, state, quarter, txn_type)}
+        GROUP BY quarter
+        ORDER BY quarter
+    """
+
+
+# ==============================================================================
+# YEAR-LEVEL CHARTS
+# ==============================================================================
+def types_sql(year):
+    return f"""
+        SELECT
+            transaction_type,
+            SUM(transaction_count) as count,
+            SUM(transaction_amount) as amount
+        FROM aggregated_transactions
+        WHERE year = {year}
+        GROUP BY transaction_type
+        ORDER BY count DESC
+    """
+
+
+def states_sql(year, n=10):
+    return f"""
+        SELECT
+            state,
+            SUM(transaction_count) as transactions,
+            SUM(transaction_amount) as amount
+        FROM aggregated_transactions
+        WHERE year = {year}
+        GROUP BY state
+        ORDER BY transactions DESC
+        LIMIT {n}
+    """
+
+
+def user_states_sql(year, n=15):
+    # Districts ("State / District"), keyed by state too: map_users holds only the district name
+    return f"""
+        SELECT
+            n.label as state,
+            SUM(f.registered_users) as users,
+            SUM(f.app_opens) as app_opens
+        FROM district_facts f
+        JOIN {DISTRICT_LABELS_SQL} n ON n.district_key = f.district_key
+        WHERE f.year = {year} AND f.registered_users IS NOT NULL
+        GROUP BY n.label
+        ORDER BY users DESC
+        LIMIT {n}
+    """
+
+
+def devices_sql(year, n=10):
+    return f"""
+        SELECT
+            device_brand,
+            SUM(device_count) as count
+        FROM aggregated_users
+        WHERE year = {year}
+        GROUP BY device_brand
+        ORDER BY count DESC
+        LIMIT {n}
+    """
+
+
+def insurance_states_sql(year, n=10):
+    return f"""
+        SELECT
+            state,
+            SUM(insurance_count) as policies,
+            SUM(insurance_amount) as amount
+        FROM aggregated_insurances
+        WHERE year = {year}
+        GROUP BY state
+        ORDER BY policies DESC
+        LIMIT {n}
+    """
+
+
+def insurance_quarterly_sql(year):
+    return f"""
+        SELECT
+            quarter,
+            SUM(insurance_count) as policies,
+            SUM(insurance_amount) as amount
+        FROM aggregated_insurances
+        WHERE year = {year}
+        GROUP BY quarter
+        ORDER BY quarter
+    """
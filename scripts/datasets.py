@@ -0,0 +1,41 @@
+"""
+Registry of every loader dataset.
+- Maps loader names (e.g. "map_transaction") to their Dataset definitions
+- Used by tools that ingest several datasets in one run
+"""
+import load_aggregated_insurance
+import load_aggregated_transaction
+import load_aggregated_user
+import load_map_insurance
+import load_map_transaction
+import load_map_user
+import load_top_insurance
+import load_top_transaction
+import load_top_user
+
+# Listed in the order the loaders are usually run
+DATASETS = {
+    module.DATASET.name: module.DATASET
+    for module in (
+        load_aggregated_transaction,
+        load_aggregated_user,
+        load_aggregated_insurance,
+        load_map_transaction,
+        load_map_user,
+        load_map_insurance,
+        load_top_transaction,
+        load_top_user,
+        load_top_insurance,
+    )
+}
+
+
+def get_datasets(names=None):
+    """Return the Dataset objects for the given names (all datasets if None)"""
+    if not names:
+        return list(DATASETS.values())
+    unknown = [name for name in names if name not in DATASETS]
+    if unknown:
+        raise ValueError(f"Unknown dataset(s): {', '.join(unknown)}. "
+                         f"Choose from: {', '.join(DATASETS)}")
+    return [DATASETS[name] for name in names]
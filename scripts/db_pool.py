@@ -0,0 +1,88 @@
+"""
+Small thread-safe connection pool for the dashboard.
+- Streamlit runs every session's reruns in its own thread; a single shared
+  pymysql connection is not thread-safe, so each query borrows a connection
+- Connections are opened lazily up to `size`; when all are busy the caller
+  waits (counted in waits / wait_seconds, which the load test reports)
+- Idle connections are pinged before reuse, so one dropped by MySQL's
+  wait_timeout is reconnected instead of failing the next query
+
+Usage:
+    pool = ConnectionPool(lambda: pymysql.connect(**DB_CONFIG), size=4)
+    with pool.connection() as conn:
+        df = read_frame(sql, conn)
+"""
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """At most `size` open connections, handed out one caller at a time"""
+
+    def __init__(self, factory, size=4, timeout=30):
+        self.factory = factory
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # most recently used first: fewer stale connections
+        self._lock = threading.Lock()
+        self._opened = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    return self.factory()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            start = time.perf_counter()
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise RuntimeError(f"No database connection free after {self.timeout}s "
+                                   f"(pool size {self.size})")
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += time.perf_counter() - start
+        if hasattr(conn, "ping"):
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1  # server unreachable: forget the connection
+                raise
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the with block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """Close the idle connections (e.g. between load-test runs)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._opened -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,140 @@
+"""
+District fact table joining map_transactions, map_users and map_insurances.
+- One row per (year, quarter, district) with every source's measures side by
+  side, keyed by name_keys (state_key, district_key), so the sources join
+  however they spell or case a name
+- Filled at ingest: each map_* file upserts its own columns in the same
+  transaction as its rows. map_users has no state column, but the file sits
+  under its state's folder, so the state is known there
+- The ratios are STORED generated columns: MySQL recomputes them whenever a
+  loader updates one side, and readers get them without any join
+
+Rebuild from the data tree (e.g. for tables loaded before this existed):
+    python district_facts.py
+"""
+import json
+import argparse
+
+from name_keys import name_key, district_key
+
+FACTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS district_facts (
+        year INT NOT NULL,
+        quarter INT NOT NULL,
+        district_key VARCHAR(150) NOT NULL,
+        state_key VARCHAR(100) NOT NULL,
+        state VARCHAR(100) DEFAULT NULL,
+        district VARCHAR(100) DEFAULT NULL,
+        transaction_count BIGINT DEFAULT NULL,
+        transaction_amount DOUBLE DEFAULT NULL,
+        registered_users BIGINT DEFAULT NULL,
+        app_opens BIGINT DEFAULT NULL,
+        insurance_count BIGINT DEFAULT NULL,
+        insurance_amount DOUBLE DEFAULT NULL,
+        transactions_per_user DOUBLE AS (transaction_count / NULLIF(registered_users, 0)) STORED,
+        amount_per_user DOUBLE AS (transaction_amount / NULLIF(registered_users, 0)) STORED,
+        amount_per_app_open DOUBLE AS (transaction_amount / NULLIF(app_opens, 0)) STORED,
+        opens_per_user DOUBLE AS (app_opens / NULLIF(registered_users, 0)) STORED,
+        avg_transaction_value DOUBLE AS (transaction_amount / NULLIF(transaction_count, 0)) STORED,
+        insurance_penetration DOUBLE AS (insurance_count / NULLIF(registered_users, 0)) STORED,
+        PRIMARY KEY (year, quarter, district_key),
+        KEY entity_lookup (district_key),
+        KEY state_period (state_key, year, quarter)
+    )
+"""
+
+# Loader -> the two fact columns it fills (the last two values of its rows)
+FACT_COLUMNS = {
+    "map_transaction": ("transaction_count", "transaction_amount"),
+    "map_user": ("registered_users", "app_opens"),
+    "map_insurance": ("insurance_count", "insurance_amount"),
+}
+
+TABLE = "district_facts"
+
+# One "State / District" label per district_key, as the map_* sources may spell a name
+# differently. Readers join it: JOIN {DISTRICT_LABELS_SQL} n ON n.district_key = f.district_key
+DISTRICT_LABELS_SQL = """(
+    SELECT district_key, CONCAT(MAX(state), ' / ', MAX(district)) AS label
+    FROM district_facts GROUP BY district_key
+)"""
+
+
+def upsert_sql(loader):
+    """INSERT ... ON DUPLICATE KEY UPDATE of one loader's columns, leaving the others as they are"""
+    first, second = FACT_COLUMNS[loader]
+    return f"""
+        INSERT INTO district_facts (
+            year, quarter, district_key, state_key, state, district, {first}, {second}
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE {first} = VALUES({first}), {second} = VALUES({second})
+    """
+
+
+def clear_sql(loader):
+    """UPDATE emptying one loader's columns before it loads everything again"""
+    first, second = FACT_COLUMNS[loader]
+    return f"UPDATE district_facts SET {first} = NULL, {second} = NULL"
+
+
+def fact_rows(loader, state, rows):
+    """
+    Fact rows of one file's parsed rows. The district is the third value from the
+    end of every map_* row; districts whose names reduce to the same key are summed.
+    """
+    facts = {}
+    for row in rows:
+        year, quarter, district = row[0], row[1], row[-3]
+        key = (year, quarter, district_key(state, district))
+        if key not in facts:
+            facts[key] = [year, quarter, key[2], name_key(state), state.title(), district, 0, 0]
+        facts[key][6] += row[-2] or 0
+        facts[key][7] += row[-1] or 0
+    return [tuple(fact) for fact in facts.values()]
+
+
+def build_district_facts(conn, data_root, archive=None):
+    """Upsert every map_* file of the data tree; returns {loader: fact rows written}"""
+    from datasets import DATASETS
+    from ingest_common import iter_source
+
+    cursor = conn.cursor()
+    cursor.execute(FACTS_TABLE_SQL)
+    written = {}
+    for loader in FACT_COLUMNS:
+        dataset = DATASETS[loader]
+        count = 0
+        for state, year, quarter, rel_path, read in iter_source(dataset, data_root, archive):
+            try:
+                rows = dataset.parse(json.loads(read()), state, year, quarter)
+            except Exception as e:
+                print(f"Error reading {rel_path}: {e}")
+                continue
+            facts = fact_rows(loader, state, rows)
+            if facts:
+                cursor.executemany(upsert_sql(loader), facts)
+            count += len(facts)
+        conn.commit()
+        written[loader] = count
+    cursor.close()
+    return written
+
+
+if __name__ == "__main__":
+    from ingest_common import DATA_ROOT, connect
+    from change_feed import CHANGES_TABLE_SQL, log_change
+
+    parser = argparse.ArgumentParser(description="Rebuild the district fact table from the data tree")
+    parser.add_argument("--data-root", default=DATA_ROOT, help="path to the PhonePe Pulse data/ directory")
+    parser.add_argument("--archive",
+                        help="read from a .zip/.tar[.gz|.zst] of the data tree instead of --data-root")
+    args = parser.parse_args()
+
+    conn = connect()
+    for loader, count in build_district_facts(conn, args.data_root, args.archive).items():
+        print(f"{loader}: {count} district rows")
+    cursor = conn.cursor()
+    cursor.execute(CHANGES_TABLE_SQL)
+    log_change(cursor, "district_facts", TABLE)
+    conn.commit()
+    conn.close()
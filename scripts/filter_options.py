@@ -0,0 +1,74 @@
+"""
+Sidebar filter values (years, states, transaction types), precomputed at ingest.
+- run_loader and the async pipeline rewrite the file after loading aggregated_transactions
+- The dashboard reads it instead of running three SELECT DISTINCT queries on every
+  cold start; the change-feed version in the file tells it when the file is stale
+
+Rebuild by hand:
+    python filter_options.py
+"""
+import os
+import json
+import time
+
+OPTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                            "Streamlit_Dashboard", "cache", "filter_options.json")
+
+SOURCE_TABLE = "aggregated_transactions"
+
+# Same queries (and order) the dashboard sidebar used to run
+OPTION_QUERIES = {
+    "years": "SELECT DISTINCT year FROM aggregated_transactions ORDER BY year DESC",
+    "states": "SELECT DISTINCT state FROM aggregated_transactions ORDER BY state",
+    "types": "SELECT DISTINCT transaction_type FROM aggregated_transactions",
+}
+
+
+def build_options(cursor):
+    """Run the option queries and return the file contents as a dict"""
+    from change_feed import latest_versions
+    options = {
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "version": latest_versions(cursor).get(SOURCE_TABLE, 0),
+    }
+    for name, sql in OPTION_QUERIES.items():
+        cursor.execute(sql)
+        values = [row[0] for row in cursor.fetchall() if row[0] is not None]
+        options[name] = [int(v) for v in values] if name == "years" else [str(v) for v in values]
+    return options
+
+
+def save_options(options, path=OPTIONS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(options, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def refresh_options(conn, path=OPTIONS_PATH):
+    """Rebuild the file from the loaded table; failures only print (the dashboard falls back to SQL)"""
+    cursor = conn.cursor()
+    try:
+        save_options(build_options(cursor), path)
+    except Exception as e:
+        print(f"Could not refresh filter options: {e}")
+    finally:
+        cursor.close()
+
+
+def load_options(path=OPTIONS_PATH):
+    """The saved options, or None if the file does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    from ingest_common import connect
+
+    conn = connect()
+    refresh_options(conn)
+    conn.close()
+    print(f"Filter options written to {OPTIONS_PATH}")
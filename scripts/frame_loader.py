@@ -0,0 +1,160 @@
+"""
+Chunked, dtype-aware replacement for pd.read_sql.
+- Streams results with an unbuffered server-side cursor (pymysql SSCursor),
+  so the full result set is never held as Python row tuples
+- Converts each chunk column by column straight into typed NumPy arrays
+- Uses compact dtypes for known columns (int16 year, int8 quarter,
+  category for names, float32 where precision allows)
+- Numeric results without a known dtype (e.g. SUM(...) aliases, which MySQL
+  returns as DECIMAL) become float64/int64 instead of object
+
+Usage (same argument order as pd.read_sql):
+    df = read_frame("SELECT * FROM map_transactions", conn)
+"""
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+CHUNK_SIZE = 10_000
+
+# Compact dtypes per column name; other columns are inferred
+COLUMN_DTYPES = {
+    "id": "int32",
+    "year": "int16",
+    "quarter": "int8",
+    "state": "category",
+    "district": "category",
+    "transaction_type": "category",
+    "device_brand": "category",
+    "level_type": "category",
+    "state_or_district_or_pincode": "category",
+    "transaction_count": "int64",
+    "transaction_amount": "float64",
+    "insurance_count": "int64",
+    "insurance_amount": "float64",
+    "registered_users": "int64",
+    "app_opens": "int64",
+    "device_count": "int64",
+    "device_percentage": "float32",
+}
+
+
+# ==============================================================================
+# COLUMN BUILDERS (one per result column, fed chunk by chunk)
+# ==============================================================================
+class _CategoryColumn:
+    """Keeps int32 codes per chunk and one dict of distinct values"""
+
+    def __init__(self):
+        self.lookup = {}
+        self.chunks = []
+
+    def add(self, values):
+        lookup = self.lookup
+        codes = np.fromiter(
+            (-1 if v is None else lookup.setdefault(v, len(lookup)) for v in values),
+            dtype=np.int32, count=len(values),
+        )
+        self.chunks.append(codes)
+
+    def finish(self):
+        codes = np.concatenate(self.chunks) if self.chunks else np.array([], dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=list(self.lookup))
+
+
+class _NumericColumn:
+    """Typed NumPy chunks; integer columns with NULLs become pandas nullable integers"""
+
+    def __init__(self, dtype):
+        self.dtype = np.dtype(dtype)
+        self.chunks = []
+        self.masks = []
+        self.has_nulls = False
+
+    def add(self, values):
+        if self.dtype.kind == "f":
+            # None converts to NaN for float dtypes
+            self.chunks.append(np.array(values, dtype=self.dtype))
+            return
+        mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+        if mask.any():
+            self.has_nulls = True
+            values = [0 if v is None else v for v in values]
+        self.chunks.append(np.array(values, dtype=self.dtype))
+        self.masks.append(mask)
+
+    def finish(self):
+        data = np.concatenate(self.chunks) if self.chunks else np.array([], dtype=self.dtype)
+        if self.has_nulls:
+            return pd.arrays.IntegerArray(data, np.concatenate(self.masks))
+        return data
+
+
+class _InferredColumn:
+    """Columns without a known dtype: numbers become float64/int64, the rest stay object"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def add(self, values):
+        self.chunks.append(np.array(values, dtype=object))
+
+    def finish(self):
+        data = np.concatenate(self.chunks) if self.chunks else np.array([], dtype=object)
+        present = [v for v in data if v is not None]
+        if not present or not all(isinstance(v, (int, float, Decimal)) and not isinstance(v, bool)
+                                  for v in present):
+            return data
+        if len(present) == len(data) and all(isinstance(v, int) for v in present):
+            return data.astype(np.int64)
+        return np.array([np.nan if v is None else float(v) for v in data], dtype=np.float64)
+
+
+def _builder(dtype):
+    if dtype is None:
+        return _InferredColumn()
+    if dtype == "category":
+        return _CategoryColumn()
+    return _NumericColumn(dtype)
+
+
+# ==============================================================================
+# LOADER
+# ==============================================================================
+def _open_cursor(conn):
+    """Unbuffered cursor for MySQL connections; a normal cursor for anything else"""
+    if isinstance(conn, pymysql.connections.Connection):
+        return conn.cursor(pymysql.cursors.SSCursor)
+    return conn.cursor()
+
+
+def read_frame(sql, conn, dtypes=None, chunk_size=CHUNK_SIZE):
+    """
+    Run a query and return a DataFrame built from typed column arrays.
+    dtypes overrides/extends COLUMN_DTYPES for this query (None values force inference).
+    """
+    column_dtypes = dict(COLUMN_DTYPES)
+    if dtypes:
+        column_dtypes.update(dtypes)
+
+    cursor = _open_cursor(conn)
+    try:
+        cursor.execute(sql)
+        if cursor.description is None:
+            return pd.DataFrame()
+        columns = [d[0] for d in cursor.description]
+        builders = [_builder(column_dtypes.get(col)) for col in columns]
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            # Transpose the chunk once; each column goes straight into its builder
+            for builder, values in zip(builders, zip(*rows)):
+                builder.add(values)
+    finally:
+        cursor.close()
+
+    return pd.DataFrame({col: builder.finish() for col, builder in zip(columns, builders)})
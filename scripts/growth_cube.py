@@ -0,0 +1,214 @@
+"""
+Vectorised growth analytics over (entity x quarter) NumPy cubes.
+- One query per (metric, level) loads every entity and quarter at once
+- Values sit in a dense float array, one row per state/district, one column per
+  consecutive quarter (missing quarters are NaN)
+- QoQ/YoY growth, CAGR and rolling means are whole-array operations
+
+Usage:
+    cube = load_cube(conn, "transaction_count", "state")
+    yoy = cube.yoy()                      # same shape as cube.values
+    col = cube.period_index(2023, 4)
+    top = cube.top(yoy[:, col], 10)       # [(entity, growth), ...]
+"""
+import numpy as np
+
+from district_facts import DISTRICT_LABELS_SQL
+
+# District user metrics: map_users has no district column (load_map_user.py stores the
+# district name in `state`, and names such as Aurangabad or North District recur across
+# states), so they read district_facts, keyed by state and district.
+FACT_DISTRICT_SQL = f"""
+    SELECT n.label, f.year, f.quarter, f.{{column}}
+    FROM district_facts f
+    JOIN {DISTRICT_LABELS_SQL} n ON n.district_key = f.district_key
+    WHERE f.{{column}} IS NOT NULL
+"""
+
+# SQL returning (entity, year, quarter, value) for every metric and level.
+# aggregated_users repeats the state's registered users/app opens on every device row, hence MAX.
+METRIC_QUERIES = {
+    ("transaction_count", "state"):
+        "SELECT state, year, quarter, SUM(transaction_count) FROM aggregated_transactions GROUP BY state, year, quarter",
+    ("transaction_count", "district"):
+        "SELECT CONCAT(state, ' / ', district), year, quarter, SUM(transaction_count) FROM map_transactions GROUP BY state, district, year, quarter",
+    ("transaction_amount", "state"):
+        "SELECT state, year, quarter, SUM(transaction_amount) FROM aggregated_transactions GROUP BY state, year, quarter",
+    ("transaction_amount", "district"):
+        "SELECT CONCAT(state, ' / ', district), year, quarter, SUM(transaction_amount) FROM map_transactions GROUP BY state, district, year, quarter",
+    ("registered_users", "state"):
+        "SELECT state, year, quarter, MAX(registered_users) FROM aggregated_users GROUP BY state, year, quarter",
+    ("registered_users", "district"):
+        FACT_DISTRICT_SQL.format(column="registered_users"),
+    ("app_opens", "state"):
+        "SELECT state, year, quarter, MAX(app_opens) FROM aggregated_users GROUP BY state, year, quarter",
+    ("app_opens", "district"):
+        FACT_DISTRICT_SQL.format(column="app_opens"),
+    ("insurance_count", "state"):
+        "SELECT state, year, quarter, SUM(insurance_count) FROM aggregated_insurances GROUP BY state, year, quarter",
+    ("insurance_count", "district"):
+        "SELECT CONCAT(state, ' / ', district), year, quarter, SUM(insurance_count) FROM map_insurances GROUP BY state, district, year, quarter",
+    ("insurance_amount", "state"):
+        "SELECT state, year, quarter, SUM(insurance_amount) FROM aggregated_insurances GROUP BY state, year, quarter",
+    ("insurance_amount", "district"):
+        "SELECT CONCAT(state, ' / ', district), year, quarter, SUM(insurance_amount) FROM map_insurances GROUP BY state, district, year, quarter",
+}
+
+METRICS = sorted({metric for metric, _ in METRIC_QUERIES})
+LEVELS = ["state", "district"]
+
+
+def _safe_ratio(numerator, denominator):
+    """numerator / denominator with NaN wherever the denominator is missing or not positive"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = numerator / denominator
+    result[~(denominator > 0)] = np.nan
+    return result
+
+
+def _lag(values, periods):
+    """Shift columns right by `periods`, filling the first columns with NaN"""
+    lagged = np.full_like(values, np.nan)
+    if periods < values.shape[1]:
+        lagged[:, periods:] = values[:, :-periods]
+    return lagged
+
+
+class GrowthCube:
+    """Dense entity x quarter array of one metric"""
+
+    def __init__(self, entities, periods, values):
+        self.entities = entities    # np.ndarray of entity names, one per row
+        self.periods = periods      # list of (year, quarter), one per column, consecutive
+        self.values = values        # float64 array [len(entities), len(periods)]
+        self._period_pos = {p: i for i, p in enumerate(periods)}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a cube from (entity, year, quarter, value) rows"""
+        if not rows:
+            return cls(np.array([], dtype=object), [], np.zeros((0, 0)))
+
+        entity_col = np.array([r[0] for r in rows], dtype=object)
+        year = np.array([r[1] for r in rows], dtype=np.int64)
+        quarter = np.array([r[2] for r in rows], dtype=np.int64)
+        value = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+
+        entities, row_index = np.unique(entity_col.astype(str), return_inverse=True)
+        # Quarters numbered consecutively so lags of 1 and 4 are QoQ and YoY
+        serial = year * 4 + (quarter - 1)
+        first = serial.min()
+        n_periods = int(serial.max() - first + 1)
+        periods = [(int((first + i) // 4), int((first + i) % 4 + 1)) for i in range(n_periods)]
+
+        values = np.full((len(entities), n_periods), np.nan)
+        col_index = serial - first
+        valid = ~np.isnan(value)
+        # Sum duplicates; cells with no valid rows stay NaN
+        filled = np.zeros_like(values)
+        seen = np.zeros(values.shape, dtype=bool)
+        np.add.at(filled, (row_index[valid], col_index[valid]), value[valid])
+        seen[row_index[valid], col_index[valid]] = True
+        values[seen] = filled[seen]
+        return cls(entities, periods, values)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def period_index(self, year, quarter):
+        """Column of a (year, quarter); None if outside the cube"""
+        return self._period_pos.get((int(year), int(quarter)))
+
+    def latest_period(self, year=None):
+        """Last period with any data, optionally limited to one year"""
+        has_data = ~np.all(np.isnan(self.values), axis=0)
+        for i in range(len(self.periods) - 1, -1, -1):
+            if has_data[i] and (year is None or self.periods[i][0] == int(year)):
+                return self.periods[i]
+        return None
+
+    def total(self):
+        """Sum over all entities, as a 1 x periods cube (NaN where no entity has data)"""
+        all_missing = np.all(np.isnan(self.values), axis=0)
+        totals = np.nansum(self.values, axis=0)
+        totals[all_missing] = np.nan
+        return GrowthCube(np.array(["All"], dtype=object), self.periods, totals[np.newaxis, :])
+
+    def top(self, column, n=10, largest=True):
+        """Top n (entity, value) pairs of a per-entity vector, ignoring NaN"""
+        valid = np.flatnonzero(np.isfinite(column))
+        if len(valid) == 0:
+            return []
+        order = np.argsort(column[valid])
+        if largest:
+            order = order[::-1]
+        picked = valid[order[:n]]
+        return [(str(self.entities[i]), float(column[i])) for i in picked]
+
+    # ------------------------------------------------------------------
+    # Growth measures (all return arrays shaped like values)
+    # ------------------------------------------------------------------
+    def qoq(self):
+        """Quarter-over-quarter growth rate"""
+        return _safe_ratio(self.values, _lag(self.values, 1)) - 1
+
+    def yoy(self):
+        """Year-over-year growth rate (same quarter a year earlier)"""
+        return _safe_ratio(self.values, _lag(self.values, 4)) - 1
+
+    def rolling_mean(self, window=4):
+        """Trailing mean over `window` quarters; NaN until the window is full of data"""
+        filled = np.nan_to_num(self.values)
+        counts = (~np.isnan(self.values)).astype(np.int64)
+        sums = np.cumsum(filled, axis=1)
+        nums = np.cumsum(counts, axis=1)
+        sums[:, window:] = sums[:, window:] - sums[:, :-window]
+        nums[:, window:] = nums[:, window:] - nums[:, :-window]
+        result = _safe_ratio(sums, nums.astype(np.float64))
+        result[:, :window - 1] = np.nan
+        result[nums < window] = np.nan
+        return result
+
+    def cagr(self):
+        """
+        Compound annual growth rate per entity between its first and last
+        quarter with a positive value. Returns a vector with one value per entity.
+        """
+        positive = self.values > 0
+        has_any = positive.any(axis=1)
+        first = np.argmax(positive, axis=1)
+        last = self.values.shape[1] - 1 - np.argmax(positive[:, ::-1], axis=1)
+        rows = np.arange(len(self.entities))
+        start = self.values[rows, first]
+        end = self.values[rows, last]
+        years = (last - first) / 4.0
+
+        result = np.full(len(self.entities), np.nan)
+        ok = has_any & (years > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result[ok] = (end[ok] / start[ok]) ** (1.0 / years[ok]) - 1
+        return result
+
+    def to_frame(self, array=None, name="value"):
+        """Long DataFrame (entity, year, quarter, name) of values or a derived array"""
+        import pandas as pd
+        array = self.values if array is None else array
+        n_entities, n_periods = array.shape
+        return pd.DataFrame({
+            "entity": np.repeat(self.entities, n_periods),
+            "year": np.tile([p[0] for p in self.periods], n_entities),
+            "quarter": np.tile([p[1] for p in self.periods], n_entities),
+            name: array.ravel(),
+        })
+
+
+def load_cube(conn, metric, level="state"):
+    """Run the metric's single GROUP BY query and build its cube"""
+    sql = METRIC_QUERIES[(metric, level)]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return GrowthCube.from_rows(rows)
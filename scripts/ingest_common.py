@@ -0,0 +1,335 @@
+"""
+Shared helpers used by the load_*.py scripts.
+- Database connection settings
+- Walks the state/year/quarter JSON tree in a stable order
+- Commits per file (or per batch of files) together with a checkpoint row
+- Supports --resume to continue from the last committed file; without it a
+  load first deletes the dataset's rows, so a rerun replaces them
+- Can read from an archive of the data tree instead (--archive)
+- Validates every file's rows in the same pass (see validation.py)
+- Logs each committed file to the ingest_changes feed (see change_feed.py)
+- Refreshes the dashboard's filter options after loading aggregated_transactions
+- Upserts each map_* file into the district fact table (see district_facts.py)
+- Recomputes district anomalies after loading a map_* table (see anomalies.py)
+- Rebuilds the insurance heatmap bins after loading map_insurance (see build_insurance_heatmap.py)
+- Rebuilds the dashboard's district/pincode search index after loading its tables
+- Rebuilds the dashboard's top-K ranking index after every load (see topk_index.py)
+- Reuses the parsed rows of files unchanged since the last run (see parse_cache.py)
+- Refreshes the dashboard workers' shared cache of the loaded tables (see shared_cache.py)
+"""
+import os
+import json
+import argparse
+from collections import namedtuple
+
+import pymysql
+
+import anomalies
+import build_insurance_heatmap
+import district_facts
+from archive_source import iter_archive_files
+from change_feed import CHANGES_TABLE_SQL, LOG_CHANGE_SQL, log_change, tables_in
+import filter_options
+import parse_cache
+import search_index
+import shared_cache
+import topk_index
+from validation import (
+    StreamValidator, TOTALS_TABLE_SQL, LOAD_TOTALS_SQL, CLEAR_TOTALS_SQL, SAVE_TOTALS_SQL, seed_datasets,
+)
+
+# Database connection settings shared by every loader
+DB_CONFIG = dict(
+    host="localhost",
+    user="root",
+    password="root",  # replace with your actual password if needed
+    database="phone_pe"
+)
+
+# Default location of the PhonePe Pulse data tree (repo's data/ folder)
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+# A loader is described by:
+# - name: key used in the checkpoint table (e.g. "aggregated_insurance")
+# - base_dir: path of the state directory relative to the data root, "/" separated
+# - insert_sql: parameterised INSERT statement for one row
+# - parse: function(content, state, year, quarter) -> list of row tuples
+Dataset = namedtuple("Dataset", ["name", "base_dir", "insert_sql", "parse"])
+
+CHECKPOINT_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+        loader VARCHAR(50) NOT NULL,
+        file_path VARCHAR(255) NOT NULL,
+        row_count INT DEFAULT NULL,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (loader, file_path)
+    )
+"""
+
+COMPLETED_FILES_SQL = "SELECT file_path FROM ingest_checkpoints WHERE loader = %s"
+
+CLEAR_CHECKPOINTS_SQL = "DELETE FROM ingest_checkpoints WHERE loader = %s"
+
+MARK_DONE_SQL = """
+    INSERT INTO ingest_checkpoints (loader, file_path, row_count)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE row_count = VALUES(row_count), loaded_at = CURRENT_TIMESTAMP
+"""
+
+
+def target_table(dataset):
+    """Table a dataset inserts into, taken from its INSERT statement"""
+    return tables_in(dataset.insert_sql)[0]
+
+
+def connect():
+    """Open a new connection to the phone_pe database"""
+    return pymysql.connect(**DB_CONFIG)
+
+
+def parse_args(description, argv=None):
+    """Command line options shared by all loaders"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--resume", action="store_true",
+                        help="skip files already committed by a previous run")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="number of files per transaction (default: 1)")
+    parser.add_argument("--data-root", default=DATA_ROOT,
+                        help="path to the PhonePe Pulse data/ directory")
+    parser.add_argument("--archive",
+                        help="read from a .zip/.tar[.gz|.zst] of the data tree instead of --data-root")
+    parser.add_argument("--report",
+                        help="also write the validation report as JSON to this path")
+    parser.add_argument("--parse-cache-mb", type=int, default=parse_cache.DEFAULT_MAX_MB,
+                        help=f"size limit of the parsed-file cache, 0 to disable "
+                             f"(default: {parse_cache.DEFAULT_MAX_MB})")
+    return parser.parse_args(argv)
+
+
+def iter_quarter_files(data_root, base_dir):
+    """
+    Yield (state, year, quarter, file_path, rel_path) for every
+    <state>/<year>/<quarter>.json file below base_dir.
+    Directories are walked in sorted order so checkpoints are stable between runs.
+    rel_path is "/" separated and relative to the data root.
+    """
+    base_path = os.path.join(data_root, *base_dir.split("/"))
+
+    for state in sorted(os.listdir(base_path)):
+        state_path = os.path.join(base_path, state)
+        if not os.path.isdir(state_path):
+            continue  # Skip if not a directory
+
+        for year in sorted(os.listdir(state_path)):
+            year_path = os.path.join(state_path, year)
+            if not os.path.isdir(year_path) or not year.isdigit():
+                continue
+
+            for file in sorted(os.listdir(year_path)):
+                if not file.endswith(".json"):
+                    continue  # Skip non-JSON files
+
+                try:
+                    quarter = int(file.replace(".json", ""))
+                except ValueError:
+                    print(f"Skipping invalid file: {file}")
+                    continue
+
+                rel_path = f"{base_dir}/{state}/{year}/{file}"
+                yield state, int(year), quarter, os.path.join(year_path, file), rel_path
+
+
+def read_file(file_path):
+    """Read a whole file as bytes"""
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def iter_source(dataset, data_root, archive=None):
+    """
+    Yield (state, year, quarter, rel_path, read) for every file of a dataset,
+    either from the data directory or streamed from an archive.
+    read() returns the file's bytes.
+    """
+    if archive:
+        for _, state, year, quarter, rel_path, read in iter_archive_files(archive, [dataset]):
+            yield state, year, quarter, rel_path, read
+        return
+
+    for state, year, quarter, file_path, rel_path in iter_quarter_files(data_root, dataset.base_dir):
+        yield state, year, quarter, rel_path, (lambda file_path=file_path: read_file(file_path))
+
+
+# ==============================================================================
+# CHECKPOINTS
+# ==============================================================================
+def ensure_checkpoint_table(cursor):
+    """Create the checkpoint table if it does not exist yet"""
+    cursor.execute(CHECKPOINT_TABLE_SQL)
+
+
+def completed_files(cursor, loader):
+    """Return the set of files already committed for this loader"""
+    cursor.execute(COMPLETED_FILES_SQL, (loader,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def reset_statements(dataset):
+    """
+    (sql, params) that forget a dataset's progress and delete what it loaded: its
+    checkpoints, saved totals, table rows and district_facts columns. Run them in
+    one transaction, so a load without --resume starts from an empty table.
+    """
+    table = target_table(dataset)
+    statements = [
+        (CLEAR_CHECKPOINTS_SQL, (dataset.name,)),
+        (CLEAR_TOTALS_SQL, (dataset.name,)),
+        (f"DELETE FROM {table}", None),
+        (LOG_CHANGE_SQL, (dataset.name, table, None, None, None)),
+    ]
+    if dataset.name in district_facts.FACT_COLUMNS:
+        statements += [
+            (district_facts.clear_sql(dataset.name), None),
+            (LOG_CHANGE_SQL, (dataset.name, district_facts.TABLE, None, None, None)),
+        ]
+    return statements
+
+
+def reset_dataset(cursor, dataset):
+    """Forget previous progress and rows so the loader starts from the first file"""
+    for sql, params in reset_statements(dataset):
+        cursor.execute(sql, params)
+
+
+def mark_done(cursor, loader, rel_path, row_count):
+    """Record a file as loaded. Runs inside the same transaction as its rows."""
+    cursor.execute(MARK_DONE_SQL, (loader, rel_path, row_count))
+
+
+def ingestion_version(cursor):
+    """
+    Id of the latest ingest_changes entry, which grows with every file any loader commits.
+    Used to key caches built from the loaded tables. None if the feed is missing or
+    empty (tables loaded before it existed): nothing can be keyed on it then.
+    """
+    try:
+        cursor.execute("SELECT MAX(id) FROM ingest_changes")
+        row = cursor.fetchone()
+    except Exception:
+        return None
+    return int(row[0]) if row and row[0] is not None else None
+
+
+# ==============================================================================
+# LOADER DRIVER
+# ==============================================================================
+def run_loader(dataset, argv=None):
+    """
+    Load every file of a dataset, committing after each batch of files.
+    The rows of a file and its checkpoint row are committed together, so after
+    a crash --resume continues exactly after the last committed file.
+    Returns the number of rows inserted.
+    """
+    args = parse_args(f"Load {dataset.name} data into MySQL", argv)
+    batch_size = max(1, args.batch_size)
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    ensure_checkpoint_table(cursor)
+    cursor.execute(TOTALS_TABLE_SQL)
+    cursor.execute(CHANGES_TABLE_SQL)
+    has_facts = dataset.name in district_facts.FACT_COLUMNS
+    if has_facts:
+        cursor.execute(district_facts.FACTS_TABLE_SQL)
+    if not args.resume:
+        reset_dataset(cursor, dataset)
+    conn.commit()
+    done = completed_files(cursor, dataset.name)
+    resumed = frozenset(done)  # committed by an earlier run: skipped, not duplicates
+
+    # Totals of the other side (aggregated vs map) come from its last load
+    validator = StreamValidator()
+    for other in seed_datasets([dataset.name]):
+        cursor.execute(LOAD_TOTALS_SQL, (other,))
+        validator.seed(other, cursor.fetchall())
+
+    table = target_table(dataset)
+    cache = parse_cache.ParseCache(dataset, max_mb=args.parse_cache_mb) if args.parse_cache_mb > 0 else None
+    insert_count = 0
+    loaded = skipped = failed = 0
+    pending = 0  # files in the current, uncommitted batch
+
+    for state, year, quarter, rel_path, read in iter_source(dataset, args.data_root, args.archive):
+        if rel_path in done:
+            if rel_path in resumed:
+                skipped += 1
+            else:
+                validator.duplicate_partition(dataset.name, rel_path)
+            continue
+
+        try:
+            if cache is not None:
+                rows = cache.parse(rel_path, read(), state, year, quarter)
+            else:
+                rows = dataset.parse(json.loads(read()), state, year, quarter)
+        except Exception as e:
+            print(f"Error reading {rel_path}: {e}")
+            failed += 1
+            continue
+        rows, totals = validator.check(dataset.name, state, year, quarter, rel_path, rows)
+
+        # Savepoint so a failing file does not undo the rest of its batch
+        cursor.execute("SAVEPOINT file_start")
+        try:
+            if rows:
+                cursor.executemany(dataset.insert_sql, rows)
+            if rows and has_facts:
+                cursor.executemany(district_facts.upsert_sql(dataset.name),
+                                   district_facts.fact_rows(dataset.name, state, rows))
+            if totals:
+                cursor.execute(SAVE_TOTALS_SQL, totals)
+            mark_done(cursor, dataset.name, rel_path, len(rows))
+            if rows:
+                log_change(cursor, dataset.name, table, state, year, quarter)
+            if rows and has_facts:
+                log_change(cursor, dataset.name, district_facts.TABLE, state, year, quarter)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT file_start")
+            print(f"Insert failed for {rel_path}: {e}")
+            failed += 1
+            continue
+
+        done.add(rel_path)  # only once written: a rolled-back file may still load from a second copy
+        insert_count += len(rows)
+        loaded += 1
+        pending += 1
+        if pending >= batch_size:
+            conn.commit()
+            pending = 0
+
+    # Commit the last partial batch and close the connection
+    conn.commit()
+    cursor.close()
+    if table == filter_options.SOURCE_TABLE:
+        filter_options.refresh_options(conn)  # sidebar years/states/types for the dashboard
+    anomaly_metrics = anomalies.metrics_for([table])
+    if anomaly_metrics:
+        anomalies.refresh_anomalies(conn, anomaly_metrics)
+    if table in search_index.SOURCE_TABLES:
+        search_index.refresh_index(conn)  # district/pincode names for the sidebar search
+    if dataset.name == build_insurance_heatmap.DATASET:
+        build_insurance_heatmap.refresh_heatmap(conn, args.data_root, args.archive)
+    topk_index.refresh_index(conn)  # ranking charts' top-K lists, every table feeds one
+    shared_cache.refresh_shared_cache(conn)  # memory-mapped tables/cubes for dashboard workers
+    conn.close()
+    print(f"{dataset.name}: {loaded} files loaded, {skipped} already done, "
+          f"{failed} failed, {insert_count} rows inserted")
+    if cache is not None:
+        cache.keep(resumed)
+        cache.save()
+        print(cache.summary())
+    validator.print_report()
+    if args.report:
+        validator.save_report(args.report)
+    return insert_count
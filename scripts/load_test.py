@@ -0,0 +1,282 @@
+"""
+Load test for the dashboard: many analysts clicking sidebar filters at once.
+- Each simulated session is a random walk over the filters (year, state,
+  quarter, transaction type); every step changes one filter, like a click.
+  Popular values are picked more often (Zipf weights), as real users do
+- Record: the real app (dashboard.py) is run headless with Streamlit's AppTest
+  once per distinct filter combination the walks visit. This gives the full
+  rerun time and, through query_stats, the SQL that rerun looks up
+- Replay: all sessions then run concurrently in threads, each step issuing its
+  combination's queries the way run_query does: through a shared LRU query
+  cache (values pickled like st.cache_data) and a db_pool.ConnectionPool.
+  Replay times only the SQL and the cache lookups of a rerun, not running the
+  script or rendering its charts; those are in the recorded (AppTest) times
+- Reports the recorded p50/p95/p99 rerun time, and for every --pool-size x
+  --cache-entries combination the replayed p50/p95/p99 query time per rerun,
+  database queries/sec, cache hit rate and pool waits, so the results map
+  directly onto DASHBOARD_DB_POOL and DASHBOARD_QUERY_CACHE
+
+AppTest swaps a process-wide runtime on every run, so it cannot drive
+concurrent sessions itself; recording once and replaying the queries keeps
+the concurrency where it matters (the query cache, the pool and the database).
+
+Usage:
+    python load_test.py --sessions 30 --steps 15 --pool-size 2 4 8 --cache-entries 128 512
+    python load_test.py --standin          # SQLite stand-in (standin_db.py) instead of MySQL
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pymysql
+
+import db_pool
+import filter_options
+import frame_loader
+import standin_db
+from ingest_common import DB_CONFIG
+
+DASHBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Streamlit_Dashboard")
+DASHBOARD_PATH = os.path.join(DASHBOARD_DIR, "dashboard.py")
+
+# Sidebar selectboxes, in the order the dashboard creates them
+FILTERS = ["year", "state", "quarter", "type"]
+QUARTERS = ["All Quarters", "Q1", "Q2", "Q3", "Q4"]
+
+
+def open_connection(standin=None):
+    """A MySQL connection like the dashboard's, or one to the SQLite stand-in"""
+    if standin:
+        return standin_db.connect_standin(standin)
+    return pymysql.connect(**DB_CONFIG, autocommit=True)
+
+
+def filter_values(conn):
+    """Options of every sidebar filter, from the options file or the database"""
+    options = filter_options.load_options()
+    if options is None:
+        cursor = conn.cursor()
+        options = filter_options.build_options(cursor)
+        cursor.close()
+    return {
+        "year": options["years"],
+        "state": ["All States"] + options["states"],
+        "quarter": QUARTERS,
+        "type": ["All Types"] + options["types"],
+    }
+
+
+def random_walks(values, sessions, steps, rng):
+    """One list of filter combinations per session, starting from the sidebar defaults"""
+    weights = {name: [1 / (rank + 1) for rank in range(len(options))] for name, options in values.items()}
+    walks = []
+    for _ in range(sessions):
+        combo = {name: options[0] for name, options in values.items()}
+        walk = [tuple(combo[name] for name in FILTERS)]
+        for _ in range(steps):
+            name = rng.choice(FILTERS)
+            combo[name] = rng.choices(values[name], weights[name])[0]
+            walk.append(tuple(combo[name] for name in FILTERS))
+        walks.append(walk)
+    return walks
+
+
+def percentiles(seconds):
+    """p50/p95/p99 in milliseconds"""
+    if not seconds:
+        return [0.0, 0.0, 0.0]
+    return [float(v) * 1000 for v in np.percentile(seconds, [50, 95, 99])]
+
+
+# ==============================================================================
+# RECORD (real app, one AppTest rerun per filter combination)
+# ==============================================================================
+def record_reruns(combos, timeout=120):
+    """{combo: (rerun seconds, [sql looked up by the rerun])}"""
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+    sys.path.insert(0, DASHBOARD_DIR)
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    import query_stats
+
+    issued = []
+    query_stats.listeners.append(issued.append)
+    app = AppTest.from_file(DASHBOARD_PATH, default_timeout=timeout)
+    app.run()
+    recorded = {}
+    try:
+        for i, combo in enumerate(combos, 1):
+            for box, value in zip(app.sidebar.selectbox, combo):
+                box.set_value(value)
+            del issued[:]
+            start = time.perf_counter()
+            app.run()
+            recorded[combo] = (time.perf_counter() - start, list(issued))
+            for exception in app.exception:
+                print(f"App error for {combo}: {exception.value}")
+            if i % 25 == 0:
+                print(f"Recorded {i}/{len(combos)} filter combinations")
+    finally:
+        query_stats.listeners.remove(issued.append)
+    return recorded
+
+
+# ==============================================================================
+# REPLAY (concurrent sessions against a shared cache and pool)
+# ==============================================================================
+class QueryCache:
+    """LRU of query results keyed by SQL, like fetch_query's st.cache_data(max_entries=...)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sql):
+        with self._lock:
+            data = self._entries.get(sql)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sql)
+            self.hits += 1
+        # st.cache_data hands every caller its own copy
+        return pickle.loads(data)
+
+    def put(self, sql, df):
+        data = pickle.dumps(df)
+        with self._lock:
+            self._entries[sql] = data
+            self._entries.move_to_end(sql)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def replay(walks, recorded, pool_size, cache_entries, standin=None, think=0.0, seed=0):
+    """Run every session's walk in its own thread; returns the measurements as a dict"""
+    pool = db_pool.ConnectionPool(lambda: open_connection(standin), size=pool_size)
+    cache = QueryCache(cache_entries)
+    latencies, errors = [], []
+
+    def session(walk, rng):
+        for combo in walk:
+            start = time.perf_counter()
+            for sql in recorded[combo][1]:
+                if cache.get(sql) is not None:
+                    continue
+                try:
+                    with pool.connection() as conn:
+                        df = frame_loader.read_frame(sql, conn)
+                except Exception as e:
+                    errors.append(str(e))  # not cached, like a failed st.cache_data call
+                    continue
+                cache.put(sql, df)
+            latencies.append(time.perf_counter() - start)
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+
+    threads = [
+        threading.Thread(target=session, args=(walk, random.Random(seed + i)), daemon=True)
+        for i, walk in enumerate(walks)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    pool.close()
+
+    lookups = cache.hits + cache.misses
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        "pool_size": pool_size,
+        "cache_entries": cache_entries,
+        "reruns": len(latencies),
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "queries_per_sec": cache.misses / elapsed if elapsed else 0.0,
+        "cache_hit_rate": cache.hits / lookups if lookups else 0.0,
+        "pool_waits": pool.waits,
+        "pool_wait_ms": pool.wait_seconds * 1000,
+        "errors": len(errors),
+        "error_messages": sorted(set(errors)),
+        "seconds": elapsed,
+    }
+
+
+def print_results(app_seconds, queries_per_rerun, results):
+    p50, p95, p99 = percentiles(app_seconds)
+    print(f"\nApp reruns (AppTest, one at a time): p50 {p50:.0f} ms, p95 {p95:.0f} ms, "
+          f"p99 {p99:.0f} ms, {queries_per_rerun:.1f} queries per rerun")
+    print("\nReplay, concurrent sessions: time of each rerun's SQL and cache lookups only "
+          "(no script rerun or chart rendering; add the app rerun time above for the full rerun)")
+    print(f"\n{'pool':>5} {'cache':>6} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'queries/s':>10} {'hit rate':>9} {'pool waits':>11} {'errors':>7}")
+    for r in results:
+        print(f"{r['pool_size']:>5} {r['cache_entries']:>6} {r['reruns']:>7} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['queries_per_sec']:>10.1f} "
+              f"{r['cache_hit_rate']:>9.1%} {r['pool_waits']:>11} {r['errors']:>7}")
+    for message in sorted({m for r in results for m in r["error_messages"]}):
+        print(f"Failed query: {message}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent simulated sessions")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions (default: 20)")
+    parser.add_argument("--steps", type=int, default=10, help="filter changes per session (default: 10)")
+    parser.add_argument("--pool-size", type=int, nargs="+", default=[4], help="connection pool size(s) to try")
+    parser.add_argument("--cache-entries", type=int, nargs="+", default=[512],
+                        help="query cache size(s) to try")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="mean pause between a session's clicks in seconds (default: 0, no pause)")
+    parser.add_argument("--standin", nargs="?", const=standin_db.STANDIN_PATH,
+                        help="use the SQLite stand-in (built from data/ if missing) instead of MySQL")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the filter walks")
+    parser.add_argument("--report", help="also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    # The recorded app runs must not start the warm-up thread
+    os.environ.setdefault("DASHBOARD_WARMUP", "0")
+
+    if args.standin:
+        if not os.path.exists(args.standin):
+            print(f"Building the stand-in database at {args.standin}")
+            standin_db.build_standin(args.standin)
+        # The dashboard calls pymysql.connect; point it at the stand-in
+        pymysql.connect = lambda *a, **k: standin_db.connect_standin(args.standin)
+
+    conn = open_connection(args.standin)
+    values = filter_values(conn)
+    conn.close()
+
+    walks = random_walks(values, args.sessions, args.steps, random.Random(args.seed))
+    combos = list(dict.fromkeys(combo for walk in walks for combo in walk))
+    print(f"{args.sessions} sessions x {args.steps + 1} reruns visit {len(combos)} filter combinations")
+    recorded = record_reruns(combos)
+
+    results = [
+        replay(walks, recorded, pool_size, cache_entries, args.standin, args.think, args.seed)
+        for pool_size in args.pool_size
+        for cache_entries in args.cache_entries
+    ]
+    app_seconds = [seconds for seconds, _ in recorded.values()]
+    queries_per_rerun = float(np.mean([len(sqls) for _, sqls in recorded.values()]))
+    print_results(app_seconds, queries_per_rerun, results)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"app_rerun_ms": percentiles(app_seconds),
+                       "replay_measures": "SQL and query-cache lookups per rerun; no script rerun or rendering",
+                       "results": results}, f, indent=2)
@@ -0,0 +1,36 @@
+"""
+Normalised join keys for state and district names.
+The same place is spelled differently across sources, e.g.
+"andaman-&-nicobar-islands" (Pulse folder), "Andaman-&-Nicobar-Islands" (MySQL),
+"Andaman & Nicobar Island" (map geometry), "north goa district" (Pulse hover data).
+All of them reduce to one lowercase alphanumeric key.
+"""
+import re
+
+# Spellings that differ by more than case/punctuation, keyed by their normalised form
+ALIASES = {
+    "andamanandnicobarisland": "andamanandnicobarislands",
+    "andamannicobarislands": "andamanandnicobarislands",
+    "arunanchalpradesh": "arunachalpradesh",
+    "dadraandnagarhaveli": "dadraandnagarhavelianddamananddiu",
+    "damananddiu": "dadraandnagarhavelianddamananddiu",
+    "nctofdelhi": "delhi",
+    "orissa": "odisha",
+    "pondicherry": "puducherry",
+    "uttaranchal": "uttarakhand",
+}
+
+
+def name_key(name):
+    """Reduce a state or district name to its join key"""
+    if name is None:
+        return None
+    key = str(name).lower().replace("&", " and ")
+    key = re.sub(r"\bdistrict\b", " ", key)
+    key = re.sub(r"[^a-z0-9]+", "", key)
+    return ALIASES.get(key, key)
+
+
+def district_key(state, district):
+    """Join key for a district; districts are qualified by state (several states have a 'North District')"""
+    return f"{name_key(state)}|{name_key(district)}"
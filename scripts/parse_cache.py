@@ -0,0 +1,170 @@
+"""
+On-disk cache of parsed rows, so re-ingesting an unchanged data tree skips JSON.
+- One pack file per dataset (.parse_cache/<dataset>.pkl) maps each file path to
+  a hash of the file's bytes and its parsed rows. Loading a pack is one read and
+  one pickle.loads, several times faster than json.loads + parse of every file
+- A file whose bytes changed misses and replaces its entry. A pack is discarded
+  as a whole when its loader module's source changes, so editing a parse
+  function never serves rows of the old one
+- Saving drops the entries of files not seen in the run (e.g. removed from the
+  tree); callers mark the files they skip (--resume) with keep()
+- Bounded in size: after a pack is saved, the least recently used packs of
+  other datasets are deleted until the cache fits in --parse-cache-mb
+- Used by run_loader and the async pipeline (--parse-cache-mb 0 turns it off)
+
+Usage:
+    python parse_cache.py            # list the packs
+    python parse_cache.py --clear
+"""
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import argparse
+
+PARSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".parse_cache")
+DEFAULT_MAX_MB = 512
+
+_fingerprints = {}
+
+
+def parser_fingerprint(dataset):
+    """Hash of the source of the module that defines the dataset's parse function"""
+    if dataset.name not in _fingerprints:
+        with open(inspect.getsourcefile(dataset.parse), "rb") as f:
+            _fingerprints[dataset.name] = hashlib.blake2b(f.read(), digest_size=16).digest()
+    return _fingerprints[dataset.name]
+
+
+def content_hash(raw):
+    """Digest of a file's bytes"""
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+class ParseCache:
+    """Parsed rows of one dataset's files, loaded from and saved to its pack file"""
+
+    def __init__(self, dataset, cache_dir=PARSE_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.dataset = dataset
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.path = os.path.join(cache_dir, f"{dataset.name}.pkl")
+        self.fingerprint = parser_fingerprint(dataset)
+        self.entries = {}  # rel_path -> (content hash, rows)
+        self.seen = set()  # rel_paths looked up, added or kept in this run
+        self.hits = self.misses = 0
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                pack = pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable parse cache {self.path}: {e}")
+            return
+        if pack.get("fingerprint") == self.fingerprint:
+            self.entries = pack["entries"]
+
+    def get(self, rel_path, raw):
+        """Cached rows of a file, or None if it is new or its bytes changed"""
+        self.seen.add(rel_path)
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry[0] == content_hash(raw):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, rel_path, raw, rows):
+        """Remember the rows parsed from a file's bytes"""
+        self.seen.add(rel_path)
+        self.entries[rel_path] = (content_hash(raw), rows)
+        self.dirty = True
+
+    def keep(self, rel_paths):
+        """Mark files skipped in this run, so saving keeps their entries"""
+        self.seen.update(rel_paths)
+
+    def parse(self, rel_path, raw, state, year, quarter):
+        """Rows of a file: from the cache, or decoded and parsed, then cached"""
+        rows = self.get(rel_path, raw)
+        if rows is None:
+            rows = self.dataset.parse(json.loads(raw), state, year, quarter)
+            self.put(rel_path, raw, rows)
+        return rows
+
+    def save(self):
+        """
+        Write the pack if anything was added or some entries were not seen (those are
+        dropped), then evict other packs over the size limit
+        """
+        stale = self.entries.keys() - self.seen
+        if stale:
+            for rel_path in stale:
+                del self.entries[rel_path]
+            self.dirty = True
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if self.dirty:
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    pickle.dump({"fingerprint": self.fingerprint, "entries": self.entries},
+                                f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            elif os.path.exists(self.path):
+                os.utime(self.path)  # mark as recently used
+            evict(self.cache_dir, self.max_bytes, keep=self.path)
+        except OSError as e:
+            print(f"Could not save the parse cache: {e}")
+
+    def summary(self):
+        return f"parse cache: {self.hits} hits, {self.misses} misses"
+
+
+def cache_packs(cache_dir=PARSE_CACHE_DIR):
+    """(mtime, size, path) of every pack, least recently used first"""
+    if not os.path.isdir(cache_dir):
+        return []
+    packs = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".pkl"):
+            stat = entry.stat()
+            packs.append((stat.st_mtime, stat.st_size, entry.path))
+    return sorted(packs)
+
+
+def evict(cache_dir=PARSE_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, keep=None):
+    """Delete least recently used packs until the cache fits in max_bytes; returns the number deleted"""
+    packs = cache_packs(cache_dir)
+    total = sum(size for _, size, _ in packs)
+    deleted = 0
+    for _, size, path in packs:
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.samefile(path, keep):
+            continue  # the pack just saved stays, even on its own over the limit
+        os.remove(path)
+        total -= size
+        deleted += 1
+    return deleted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the parsed-file cache")
+    parser.add_argument("--clear", action="store_true", help="delete every pack")
+    args = parser.parse_args()
+
+    packs = cache_packs()
+    if args.clear:
+        for _, _, path in packs:
+            os.remove(path)
+        print(f"Deleted {len(packs)} packs from {PARSE_CACHE_DIR}")
+    else:
+        for _, size, path in packs:
+            print(f"{os.path.basename(path):32s} {size / 1024:10.0f} KB")
+        print(f"{len(packs)} packs, {sum(size for _, size, _ in packs) / 1024 / 1024:.1f} MB")
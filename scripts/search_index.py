@@ -0,0 +1,177 @@
+"""
+Prefix index over district and pincode names for the dashboard's search box.
+- Entries are every district of map_transactions and every pincode of the
+  top_* tables, written to a JSON file at ingest (like filter_options.py)
+- PrefixIndex keeps two sorted arrays of normalised names: whole names, and
+  the tail of each name from its second word on ("goa" finds "North Goa").
+  A lookup is two bisects plus a short scan, a few microseconds per search
+- Selecting an entry drills down on indexed keys: district_facts.district_key
+  for districts, state_or_district_or_pincode on the top_* tables for pincodes
+  (ensure_lookup_indexes adds these to tables created before they existed)
+
+Rebuild by hand:
+    python search_index.py
+"""
+import os
+import re
+import json
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from name_keys import district_key
+
+SEARCH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                           "Streamlit_Dashboard", "cache", "search_index.json")
+
+NAME_QUERIES = {
+    "district": "SELECT DISTINCT state, district FROM map_transactions",
+    "pincode": """
+        SELECT state_or_district_or_pincode FROM top_transactions
+        UNION SELECT state_or_district_or_pincode FROM top_users
+        UNION SELECT state_or_district_or_pincode FROM top_insurances
+    """,
+}
+
+SOURCE_TABLES = ["map_transactions", "top_transactions", "top_users", "top_insurances"]
+
+# Column every drill-down query filters on, per table
+LOOKUP_INDEXES = {
+    "district_facts": "district_key",
+    "top_transactions": "state_or_district_or_pincode",
+    "top_users": "state_or_district_or_pincode",
+    "top_insurances": "state_or_district_or_pincode",
+}
+
+# kind: "district" or "pincode"; key: district_key for districts, the pincode itself for pincodes
+Entity = namedtuple("Entity", ["kind", "label", "state", "key"])
+
+
+def search_text(text):
+    """Lowercase words separated by single spaces ("Andaman-&-Nicobar" -> "andaman and nicobar")"""
+    text = str(text).lower().replace("&", " and ")
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def entities_from_rows(district_rows, pincode_rows):
+    """Entities from the rows of the two NAME_QUERIES"""
+    entities = [
+        Entity("district", str(district), str(state), district_key(state, district))
+        for state, district in district_rows if district
+    ]
+    entities += [Entity("pincode", str(pin), None, str(pin)) for (pin,) in pincode_rows if pin]
+    return entities
+
+
+def entry_label(entity):
+    """Text shown for a search result"""
+    if entity.kind == "district":
+        return f"{entity.label}, {entity.state}"
+    return f"Pincode {entity.label}"
+
+
+class PrefixIndex:
+    """Sorted arrays of normalised names, searched with bisect"""
+
+    def __init__(self, entities):
+        self.entities = list(entities)
+        names, tails = [], []
+        for i, entity in enumerate(self.entities):
+            words = search_text(entity.label).split()
+            names.append((" ".join(words), i))
+            tails.extend((" ".join(words[start:]), i) for start in range(1, len(words)))
+        names.sort()
+        tails.sort()
+        self._names = [text for text, _ in names]
+        self._name_ids = [i for _, i in names]
+        self._tails = [text for text, _ in tails]
+        self._tail_ids = [i for _, i in tails]
+
+    @staticmethod
+    def _scan(keys, ids, prefix, limit, found):
+        pos = bisect_left(keys, prefix)
+        while pos < len(keys) and len(found) < limit and keys[pos].startswith(prefix):
+            if ids[pos] not in found:
+                found[ids[pos]] = None
+            pos += 1
+
+    def search(self, text, limit=20):
+        """Entities whose name, or a word of it onwards, starts with text; whole-name matches first"""
+        prefix = search_text(text)
+        if not prefix:
+            return []
+        found = {}  # insertion-ordered set of entity ids
+        self._scan(self._names, self._name_ids, prefix, limit, found)
+        self._scan(self._tails, self._tail_ids, prefix, limit, found)
+        return [self.entities[i] for i in found]
+
+
+# ==============================================================================
+# BUILD / SAVE / LOAD
+# ==============================================================================
+LOOKUP_INDEX_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM information_schema.columns
+         WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s),
+        (SELECT COUNT(*) FROM information_schema.statistics
+         WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s AND seq_in_index = 1)
+"""
+
+
+def ensure_lookup_indexes(cursor):
+    """Index the drill-down column of existing tables that were created without it"""
+    for table, column in LOOKUP_INDEXES.items():
+        cursor.execute(LOOKUP_INDEX_SQL, (table, column, table, column))
+        exists, indexed = cursor.fetchone()
+        if exists and not indexed:
+            cursor.execute(f"CREATE INDEX entity_lookup ON {table} ({column})")
+
+
+def build_index_file(cursor):
+    """Entities and source-table versions as the file's contents"""
+    from change_feed import latest_versions
+    versions = latest_versions(cursor)
+    rows = {}
+    for kind, sql in NAME_QUERIES.items():
+        cursor.execute(sql)
+        rows[kind] = cursor.fetchall()
+    return {
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "versions": {table: versions.get(table, 0) for table in SOURCE_TABLES},
+        "entities": [list(e) for e in entities_from_rows(rows["district"], rows["pincode"])],
+    }
+
+
+def refresh_index(conn, path=SEARCH_PATH):
+    """Rebuild the file (and the lookup indexes); failures only print (the dashboard builds it from SQL)"""
+    cursor = conn.cursor()
+    try:
+        ensure_lookup_indexes(cursor)
+        contents = build_index_file(cursor)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(contents, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Could not refresh the search index: {e}")
+    finally:
+        cursor.close()
+
+
+def load_index(path=SEARCH_PATH):
+    """(PrefixIndex, versions) from the saved file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        contents = json.load(f)
+    return PrefixIndex(Entity(*e) for e in contents["entities"]), contents.get("versions", {})
+
+
+if __name__ == "__main__":
+    from ingest_common import connect
+
+    conn = connect()
+    refresh_index(conn)
+    conn.close()
+    print(f"Search index written to {SEARCH_PATH}")
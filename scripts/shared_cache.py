@@ -0,0 +1,265 @@
+"""
+Memory-mapped columnar cache shared by every dashboard worker process.
+- Each table is stored column by column as .npy files (category columns as
+  int32 codes plus their categories), each growth cube as one float64 array
+- Readers open the arrays with np.load(mmap_mode="r"): the OS page cache holds
+  one copy of the data however many Streamlit processes serve the dashboard,
+  and a new worker starts without reloading anything from MySQL
+- manifest.json records the change-feed version of every table at build time,
+  so readers can skip entries whose source table has been loaded since
+- Rebuilt after every load (run_loader and the async pipeline). Only entries
+  whose source table has a newer version than the current cache are read
+  again; the others are hard-linked from it
+
+Layout:
+    shared/manifest.json
+    shared/tables/<table>/columns.json, <n>.npy per column (+ .mask.npy for NULLs,
+                                         .categories.json for category columns)
+    shared/cubes/<metric>-<level>/values.npy, entities.json, periods.json
+
+Rebuild everything by hand:
+    python shared_cache.py
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                          "Streamlit_Dashboard", "shared")
+
+TABLES = [
+    "aggregated_transactions", "aggregated_users", "aggregated_insurances",
+    "map_transactions", "map_users", "map_insurances",
+    "top_transactions", "top_users", "top_insurances",
+]
+
+
+# ==============================================================================
+# WRITE
+# ==============================================================================
+def save_frame(path, df):
+    """Write a DataFrame as one .npy file per column"""
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        base = os.path.join(path, f"{i:03d}")
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object \
+                or pd.api.types.is_string_dtype(series.dtype):
+            categorical = series.astype("category")
+            np.save(base + ".npy", categorical.cat.codes.to_numpy(dtype=np.int32))
+            with open(base + ".categories.json", "w", encoding="utf-8") as f:
+                json.dump([str(c) for c in categorical.cat.categories], f)
+            kind = "category"
+        elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            # Nullable integers: values plus a NULL mask
+            np.save(base + ".npy", series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0))
+            np.save(base + ".mask.npy", series.isna().to_numpy())
+            kind = "masked"
+        else:
+            np.save(base + ".npy", series.to_numpy())
+            kind = "numeric"
+        columns.append({"name": col, "kind": kind})
+    with open(os.path.join(path, "columns.json"), "w", encoding="utf-8") as f:
+        json.dump(columns, f)
+
+
+def save_cube(path, cube):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "values.npy"), np.ascontiguousarray(cube.values, dtype=np.float64))
+    with open(os.path.join(path, "entities.json"), "w", encoding="utf-8") as f:
+        json.dump([str(e) for e in cube.entities], f)
+    with open(os.path.join(path, "periods.json"), "w", encoding="utf-8") as f:
+        json.dump(cube.periods, f)
+
+
+def cube_tables():
+    """{cube name: table its query reads}"""
+    from change_feed import tables_in
+    from growth_cube import METRIC_QUERIES
+    return {f"{metric}-{level}": tables_in(sql)[0] for (metric, level), sql in METRIC_QUERIES.items()}
+
+
+def read_manifest(root=SHARED_DIR):
+    """The manifest of a built cache, or None"""
+    path = os.path.join(root, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def reuse_entry(output, tmp_dir, kind, name):
+    """Hard-link one entry of the current cache into the new one (copy where links fail)"""
+    def link(src, dst):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+    shutil.copytree(os.path.join(output, kind, name), os.path.join(tmp_dir, kind, name), copy_function=link)
+
+
+def build_shared_cache(conn, output=SHARED_DIR, incremental=False):
+    """
+    Write the tables and growth cubes into a fresh directory, then swap it in.
+    incremental: reuse the current cache's entries of tables unchanged since it was built.
+    """
+    from change_feed import latest_versions
+    from frame_loader import read_frame
+    from growth_cube import load_cube
+
+    cursor = conn.cursor()
+    versions = latest_versions(cursor)  # before reading, so later loads show up as newer
+    cursor.close()
+
+    cubes_by_name = cube_tables()
+    old = read_manifest(output) if incremental else None
+    reused = set()
+    if old is not None:
+        # A table's entries are reused together: all of them exist and its version is unchanged
+        built = set(old["tables"]) | set(old["cubes"])
+        for table in set(TABLES) | set(cubes_by_name.values()):
+            entries = [table] if table in TABLES else []
+            entries += [name for name, source in cubes_by_name.items() if source == table]
+            if versions.get(table, 0) == old["versions"].get(table, 0) and built.issuperset(entries):
+                reused.add(table)
+
+    tmp_dir = output + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tables, cubes = [], []
+    for table in TABLES:
+        if table in reused:
+            reuse_entry(output, tmp_dir, "tables", table)
+        else:
+            try:
+                df = read_frame(f"SELECT * FROM {table}", conn)
+            except Exception as e:
+                print(f"Skipping {table}: {e}")
+                continue
+            save_frame(os.path.join(tmp_dir, "tables", table), df)
+        tables.append(table)
+    for name, table in cubes_by_name.items():
+        if table in reused:
+            reuse_entry(output, tmp_dir, "cubes", name)
+        else:
+            metric, level = name.rsplit("-", 1)
+            save_cube(os.path.join(tmp_dir, "cubes", name), load_cube(conn, metric, level))
+        cubes.append(name)
+
+    manifest = {
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "versions": versions,
+        "tables": tables,
+        "cubes": cubes,
+        "reused": sorted(reused),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Open memmaps keep working on Linux after the old directory is removed
+    old_dir = output + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output):
+        os.rename(output, old_dir)
+    os.rename(tmp_dir, output)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def refresh_shared_cache(conn, output=SHARED_DIR):
+    """Incremental rebuild after a load; failures only print"""
+    try:
+        build_shared_cache(conn, output, incremental=True)
+    except Exception as e:
+        print(f"Could not refresh the shared cache: {e}")
+
+
+# ==============================================================================
+# READ
+# ==============================================================================
+def load_frame(path):
+    """DataFrame whose numeric columns are read-only memory maps of the .npy files"""
+    with open(os.path.join(path, "columns.json"), "r", encoding="utf-8") as f:
+        columns = json.load(f)
+    data = {}
+    for i, column in enumerate(columns):
+        base = os.path.join(path, f"{i:03d}")
+        values = np.load(base + ".npy", mmap_mode="r")
+        if column["kind"] == "category":
+            with open(base + ".categories.json", "r", encoding="utf-8") as f:
+                categories = json.load(f)
+            data[column["name"]] = pd.Categorical.from_codes(values, categories=categories)
+        elif column["kind"] == "masked":
+            mask = np.load(base + ".mask.npy", mmap_mode="r")
+            data[column["name"]] = pd.arrays.IntegerArray(values, mask)
+        else:
+            data[column["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_shared_cube(path):
+    """GrowthCube over a read-only memory map of values.npy"""
+    from growth_cube import GrowthCube
+    with open(os.path.join(path, "entities.json"), "r", encoding="utf-8") as f:
+        entities = np.array(json.load(f), dtype=object)
+    with open(os.path.join(path, "periods.json"), "r", encoding="utf-8") as f:
+        periods = [tuple(p) for p in json.load(f)]
+    return GrowthCube(entities, periods, np.load(os.path.join(path, "values.npy"), mmap_mode="r"))
+
+
+class SharedCache:
+    """Entry point for readers; frames and cubes are opened once and then reused"""
+
+    def __init__(self, root, manifest):
+        self.root = root
+        self.manifest = manifest
+        self.built_at = manifest.get("built_at")
+        self.versions = manifest.get("versions", {})
+        self._frames = {}
+        self._cubes = {}
+
+    @classmethod
+    def load(cls, root=SHARED_DIR):
+        """Open a shared cache directory; None if it has not been built"""
+        manifest = read_manifest(root)
+        return cls(root, manifest) if manifest is not None else None
+
+    def is_current(self, table, table_versions):
+        """False once the table has a newer change-feed version than the cache"""
+        return table_versions.get(table, 0) <= self.versions.get(table, 0)
+
+    def frame(self, table):
+        """The whole table as a memory-mapped DataFrame; None if not cached"""
+        if table not in self.manifest.get("tables", []):
+            return None
+        if table not in self._frames:
+            self._frames[table] = load_frame(os.path.join(self.root, "tables", table))
+        return self._frames[table]
+
+    def cube(self, metric, level):
+        """Memory-mapped GrowthCube; None if not cached"""
+        name = f"{metric}-{level}"
+        if name not in self.manifest.get("cubes", []):
+            return None
+        if name not in self._cubes:
+            self._cubes[name] = load_shared_cube(os.path.join(self.root, "cubes", name))
+        return self._cubes[name]
+
+
+if __name__ == "__main__":
+    from ingest_common import connect
+
+    parser = argparse.ArgumentParser(description="Build the memory-mapped cache shared by dashboard workers")
+    parser.add_argument("--output", default=SHARED_DIR, help="cache directory")
+    args = parser.parse_args()
+
+    conn = connect()
+    manifest = build_shared_cache(conn, args.output)
+    conn.close()
+    print(f"{len(manifest['tables'])} tables and {len(manifest['cubes'])} growth cubes "
+          f"written to {args.output}")
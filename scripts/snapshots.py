@@ -0,0 +1,319 @@
+"""
+Precomputed dashboard payloads for every sidebar filter combination.
+- Each source table is read once; every (year, state, quarter, transaction type)
+  combination is computed in pandas, with "All ..." values rolled up like
+  GROUP BY ... WITH CUBE
+- One compressed payload file per key holds the key metrics and the quarterly
+  trend; one file per year holds the year-level charts (types, top states,
+  users, devices, insurance)
+- manifest.json records the filter values and the change-feed version of every
+  source table, so readers can tell when a snapshot is older than the data
+
+Files (gzip-compressed JSON, or MessagePack with --format msgpack):
+    snapshots/manifest.json
+    snapshots/<year>/year.json.gz
+    snapshots/<year>/<state>/<quarter>/<transaction type>.json.gz
+
+Build it after loading data:
+    python snapshots.py
+"""
+import os
+import gzip
+import json
+import time
+import shutil
+import argparse
+import importlib.util
+from itertools import combinations
+from urllib.parse import quote
+
+from district_facts import DISTRICT_LABELS_SQL
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                            "Streamlit_Dashboard", "snapshots")
+
+# Labels the dashboard's sidebar uses for "no filter"
+ALL = {"state": "All States", "quarter": "All Quarters", "transaction_type": "All Types"}
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+
+SOURCE_SQL = {
+    "aggregated_transactions": "SELECT year, quarter, state, transaction_type, transaction_count, "
+                               "transaction_amount FROM aggregated_transactions",
+    "map_users": "SELECT year, quarter, state, registered_users, app_opens FROM map_users",
+    # Top user districts, keyed by state too (map_users holds only the district name)
+    "district_facts": "SELECT f.year, f.quarter, n.label AS district, f.registered_users, f.app_opens "
+                      f"FROM district_facts f JOIN {DISTRICT_LABELS_SQL} n ON n.district_key = f.district_key "
+                      "WHERE f.registered_users IS NOT NULL",
+    "aggregated_users": "SELECT year, device_brand, device_count FROM aggregated_users",
+    "aggregated_insurances": "SELECT year, quarter, state, insurance_count, insurance_amount "
+                             "FROM aggregated_insurances",
+}
+
+EXTENSIONS = {"json": ".json.gz", "msgpack": ".msgpack.gz"}
+
+
+def payload_path(root, fmt, year, state=None, quarter=None, txn_type=None):
+    """File of a key's payload, or of the year payload when only year is given"""
+    ext = EXTENSIONS[fmt]
+    if state is None:
+        return os.path.join(root, str(int(year)), "year" + ext)
+    return os.path.join(root, str(int(year)), quote(state, safe=""), quarter, quote(txn_type, safe="") + ext)
+
+
+def encode(payload, fmt):
+    if fmt == "msgpack":
+        import msgpack
+        return gzip.compress(msgpack.packb(payload, use_bin_type=True))
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def decode(data, fmt):
+    raw = gzip.decompress(data)
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+def _number(value):
+    """Plain int/float for the payload; None for NaN (SQL NULL)"""
+    if value is None or value != value:
+        return None
+    return int(value) if float(value).is_integer() and abs(value) < 2 ** 53 else float(value)
+
+
+def _table(df, columns):
+    return {"columns": columns, "rows": [[_number(v) if not isinstance(v, str) else v for v in row]
+                                         for row in df[columns].itertuples(index=False)]}
+
+
+def rollup(df, dims, values):
+    """
+    Sums of `values` per year and every subset of `dims`; dims left out of a
+    group are set to their "All ..." label. Returns {(year, *dims): {value: sum}}.
+    """
+    result = {}
+    for r in range(len(dims) + 1):
+        for keep in combinations(dims, r):
+            grouped = df.groupby(["year", *keep], observed=True, sort=False)[values].sum(min_count=1)
+            for key, row in zip(grouped.index, grouped.itertuples(index=False)):
+                key = key if isinstance(key, tuple) else (key,)
+                parts = dict(zip(["year", *keep], key))
+                full_key = (int(parts["year"]),) + tuple(parts.get(d, ALL[d]) for d in dims)
+                result[full_key] = dict(zip(values, row))
+    return result
+
+
+def load_frames(conn):
+    """One read per source table, with quarter as the sidebar's 'Q1'..'Q4' label"""
+    from frame_loader import read_frame
+    frames = {}
+    for table, sql in SOURCE_SQL.items():
+        df = read_frame(sql, conn)
+        for col in ("state", "district", "transaction_type", "device_brand"):
+            if col in df.columns:
+                df[col] = df[col].astype(str)
+        if "quarter" in df.columns:
+            df["quarter"] = "Q" + df["quarter"].astype(int).astype(str)
+        frames[table] = df
+    return frames
+
+
+def year_payload(frames, year):
+    """The charts that only depend on the year"""
+    txn = frames["aggregated_transactions"]
+    txn = txn[txn["year"] == year]
+    users = frames["district_facts"]
+    users = users[users["year"] == year]
+    devices = frames["aggregated_users"]
+    devices = devices[devices["year"] == year]
+    insurance = frames["aggregated_insurances"]
+    insurance = insurance[insurance["year"] == year]
+
+    types = (txn.groupby("transaction_type", observed=True)[["transaction_count", "transaction_amount"]].sum()
+             .rename(columns={"transaction_count": "count", "transaction_amount": "amount"})
+             .sort_values("count", ascending=False).reset_index())
+    states = (txn.groupby("state", observed=True)[["transaction_count", "transaction_amount"]].sum()
+              .rename(columns={"transaction_count": "transactions", "transaction_amount": "amount"})
+              .nlargest(10, "transactions").reset_index())
+    user_states = (users.groupby("district", observed=True)[["registered_users", "app_opens"]].sum()
+                   .rename(columns={"registered_users": "users"})
+                   .nlargest(15, "users").rename_axis("state").reset_index())
+    brands = (devices.groupby("device_brand", observed=True)[["device_count"]].sum()
+              .rename(columns={"device_count": "count"})
+              .nlargest(10, "count").reset_index())
+    policies = insurance.rename(columns={"insurance_count": "policies", "insurance_amount": "amount"})
+    insurance_states = (policies.groupby("state", observed=True)[["policies", "amount"]].sum()
+                        .nlargest(10, "policies").reset_index())
+    insurance_quarterly = (policies.groupby("quarter", observed=True)[["policies", "amount"]].sum()
+                           .sort_index().reset_index())
+    insurance_quarterly["quarter"] = insurance_quarterly["quarter"].str[1:].astype(int)
+
+    return {
+        "types": _table(types, ["transaction_type", "count", "amount"]),
+        "states": _table(states, ["state", "transactions", "amount"]),
+        "user_states": _table(user_states, ["state", "users", "app_opens"]),
+        "devices": _table(brands, ["device_brand", "count"]),
+        "insurance_states": _table(insurance_states, ["state", "policies", "amount"]),
+        "insurance_quarterly": _table(insurance_quarterly, ["quarter", "policies", "amount"]),
+    }
+
+
+def filter_values(frames):
+    """Years (newest first), states and transaction types offered by the sidebar"""
+    txn = frames["aggregated_transactions"]
+    years = sorted((int(y) for y in txn["year"].unique()), reverse=True)
+    states = [ALL["state"]] + sorted(txn["state"].unique())
+    types = [ALL["transaction_type"]] + sorted(txn["transaction_type"].unique())
+    return years, states, types
+
+
+def build_payloads(frames):
+    """
+    Yield (year, state, quarter, txn_type, payload) for every filter combination,
+    plus (year, None, None, None, payload) for each year's shared charts.
+    """
+    txn = frames["aggregated_transactions"].copy()
+    # AVG(transaction_amount / transaction_count) skips rows with a zero count, as in MySQL
+    ratio = txn["transaction_amount"] / txn["transaction_count"].where(txn["transaction_count"] != 0)
+    txn["ratio_sum"] = ratio
+    txn["ratio_n"] = ratio.notna().astype("int64")
+    txn_dims = ["state", "quarter", "transaction_type"]
+    txn_cube = rollup(txn, txn_dims, ["transaction_count", "transaction_amount", "ratio_sum", "ratio_n"])
+    user_cube = rollup(frames["map_users"], ["state", "quarter"], ["registered_users", "app_opens"])
+
+    years, states, types = filter_values(frames)
+    quarters = [ALL["quarter"]] + QUARTERS
+
+    for year in years:
+        yield year, None, None, None, year_payload(frames, year)
+        for state in states:
+            for txn_type in types:
+                # Quarterly trend rows shared by every quarter filter of this (state, type)
+                trend = [(q, txn_cube[(year, state, q, txn_type)]) for q in QUARTERS
+                         if (year, state, q, txn_type) in txn_cube]
+                for quarter in quarters:
+                    cell = txn_cube.get((year, state, quarter, txn_type), {})
+                    user_cell = user_cube.get((year, state, quarter), {})
+                    ratio_n = cell.get("ratio_n") or 0
+                    yield year, state, quarter, txn_type, {
+                        "metrics": {
+                            "total_transactions": _number(cell.get("transaction_count")),
+                            "total_amount": _number(cell.get("transaction_amount")),
+                            "avg_transaction_value": _number(cell["ratio_sum"] / ratio_n) if ratio_n else None,
+                            "total_users": _number(user_cell.get("registered_users")),
+                            "total_app_opens": _number(user_cell.get("app_opens")),
+                        },
+                        "quarterly": {
+                            "columns": ["quarter", "transactions", "amount"],
+                            "rows": [[int(q[1]), _number(c["transaction_count"]), _number(c["transaction_amount"])]
+                                     for q, c in trend if quarter == ALL["quarter"] or q == quarter],
+                        },
+                    }
+
+
+def table_versions(conn):
+    """Change-feed version of every source table (empty if the feed does not exist)"""
+    from change_feed import latest_versions
+    cursor = conn.cursor()
+    try:
+        versions = latest_versions(cursor)
+    finally:
+        cursor.close()
+    return {table: version for table, version in versions.items() if table in SOURCE_SQL}
+
+
+def build_snapshots(conn, output=SNAPSHOT_DIR, fmt="json"):
+    """Write every payload into a fresh directory, then swap it in place of the old one"""
+    versions = table_versions(conn)  # before reading, so later loads show up as newer
+    frames = load_frames(conn)
+
+    tmp_dir = output + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    count = 0
+    for year, state, quarter, txn_type, payload in build_payloads(frames):
+        path = payload_path(tmp_dir, fmt, year, state, quarter, txn_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(encode(payload, fmt))
+        count += 1
+
+    years, states, types = filter_values(frames)
+
+    manifest = {
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "format": fmt,
+        "versions": versions,
+        "years": years,
+        "states": states,
+        "types": types,
+        "files": count,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Readers see either the old or the new directory (briefly none, and fall back to SQL)
+    old_dir = output + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output):
+        os.rename(output, old_dir)
+    os.rename(tmp_dir, output)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+# ==============================================================================
+# LOOKUP
+# ==============================================================================
+class SnapshotStore:
+    """Reads payloads of a built snapshot directory by key"""
+
+    def __init__(self, root, manifest):
+        self.root = root
+        self.manifest = manifest
+        self.format = manifest.get("format", "json")
+        self.built_at = manifest.get("built_at")
+        self.versions = manifest.get("versions", {})
+
+    @classmethod
+    def load(cls, root=SNAPSHOT_DIR):
+        """Open a snapshot directory; None if it has not been built"""
+        path = os.path.join(root, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(root, json.load(f))
+
+    def is_current(self, table_versions):
+        """False once any source table has a newer change-feed version than the snapshot"""
+        return all(table_versions.get(table, 0) <= self.versions.get(table, 0) for table in SOURCE_SQL)
+
+    def payload(self, year, state=None, quarter=None, txn_type=None):
+        """The payload dict of a key (or of a year); None if it is not in the snapshot"""
+        path = payload_path(self.root, self.format, year, state, quarter, txn_type)
+        try:
+            with open(path, "rb") as f:
+                return decode(f.read(), self.format)
+        except FileNotFoundError:
+            return None
+
+
+if __name__ == "__main__":
+    from ingest_common import connect
+
+    parser = argparse.ArgumentParser(description="Precompute dashboard payloads for every filter combination")
+    parser.add_argument("--format", choices=sorted(EXTENSIONS), default="json",
+                        help="payload encoding, gzip-compressed (msgpack needs the msgpack package)")
+    parser.add_argument("--output", default=SNAPSHOT_DIR, help="snapshot directory")
+    args = parser.parse_args()
+
+    if args.format == "msgpack" and importlib.util.find_spec("msgpack") is None:
+        raise SystemExit("--format msgpack needs msgpack: pip install msgpack")
+
+    conn = connect()
+    manifest = build_snapshots(conn, args.output, args.format)
+    conn.close()
+    print(f"{manifest['files']} snapshot payloads written to {args.output}")
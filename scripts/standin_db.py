@@ -0,0 +1,192 @@
+"""
+Embedded stand-in for the phone_pe MySQL database (SQLite, no server needed).
+- build_standin() parses the data/ tree with the loaders' own parse functions
+  and writes every table the loaders fill into one SQLite file, then builds
+  the derived tables (district_facts, anomalies, insurance heatmap bins) and
+  the change feed with the same code that builds them in MySQL
+- connect_standin() returns a connection that behaves like pymysql for the
+  dashboard and the scripts: cursor(), %s parameters, commit(), close()
+- MySQL functions the dashboard uses that SQLite lacks (CONCAT) are registered
+  on every connection, and the MySQL-only parts of the scripts' CREATE TABLE
+  and upsert statements are rewritten (mysql_to_sqlite)
+
+Used by the load test (load_test.py) when no MySQL server is available.
+Build it once:
+    python standin_db.py
+"""
+import os
+import re
+import json
+import sqlite3
+import argparse
+
+from ingest_common import DATA_ROOT, iter_quarter_files, read_file, target_table
+
+STANDIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                            "Streamlit_Dashboard", "cache", "standin.sqlite")
+
+INSERT_COLUMNS = re.compile(r"INSERT\s+INTO\s+\w+\s*\(([^)]*)\)", re.IGNORECASE)
+
+# MySQL -> SQLite rewrites, applied in order
+SQLITE_REWRITES = [
+    (re.compile(r",\s*KEY\s+\w+\s*\([^)]*\)", re.IGNORECASE), ""),            # secondary indexes
+    (re.compile(r"\b\w*INT\s+NOT\s+NULL\s+AUTO_INCREMENT\b", re.IGNORECASE), "INTEGER NOT NULL"),
+    (re.compile(r"\bAS\s+\((?=[^)]*/)", re.IGNORECASE), "AS (1.0 * "),             # MySQL's / never truncates
+    (re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE), r"excluded.\1"),            # only upserts use VALUES(col)
+]
+
+
+def mysql_to_sqlite(sql):
+    """Rewrite the MySQL-only syntax of the scripts' statements for SQLite"""
+    sql = sql.replace("%s", "?")
+    for pattern, replacement in SQLITE_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def insert_columns(dataset):
+    """Column names of a dataset's INSERT statement"""
+    return [col.strip() for col in INSERT_COLUMNS.search(dataset.insert_sql).group(1).split(",")]
+
+
+def _concat(*values):
+    """MySQL CONCAT: NULL if any argument is NULL"""
+    if any(v is None for v in values):
+        return None
+    return "".join(str(v) for v in values)
+
+
+# ==============================================================================
+# CONNECTION
+# ==============================================================================
+class StandinCursor:
+    """sqlite3 cursor that accepts pymysql-style %s parameters and the scripts' MySQL DDL/upserts"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @staticmethod
+    def _sql(sql):
+        return mysql_to_sqlite(sql)
+
+    def execute(self, sql, args=None):
+        return self._cursor.execute(self._sql(sql), args or ())
+
+    def executemany(self, sql, rows):
+        return self._cursor.executemany(self._sql(sql), rows)
+
+    def __getattr__(self, name):
+        # fetchone/fetchall/fetchmany/description/rowcount/close
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StandinConnection:
+    """The subset of a pymysql connection used by the dashboard and the scripts"""
+
+    def __init__(self, path):
+        # Sessions share connections across threads through the dashboard's pool
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.create_function("CONCAT", -1, _concat)
+
+    def cursor(self):
+        return StandinCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect_standin(path=STANDIN_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No stand-in database at {path}; run standin_db.py first")
+    return StandinConnection(path)
+
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+def build_standin(path=STANDIN_PATH, data_root=DATA_ROOT):
+    """Load every dataset and its derived tables from the data tree into a fresh SQLite file; returns {table: rows}"""
+    from datasets import get_datasets
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    counts = {}
+    for dataset in get_datasets():
+        table = target_table(dataset)
+        columns = insert_columns(dataset)
+        conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, {', '.join(columns)})")
+        insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        count = 0
+        for state, year, quarter, file_path, rel_path in iter_quarter_files(data_root, dataset.base_dir):
+            try:
+                rows = dataset.parse(json.loads(read_file(file_path)), state, year, quarter)
+            except Exception as e:
+                print(f"Error reading {rel_path}: {e}")
+                continue
+            conn.executemany(insert_sql, rows)
+            count += len(rows)
+        conn.commit()
+        counts[table] = count
+    conn.close()
+
+    counts.update(build_derived(StandinConnection(tmp_path), data_root, list(counts)))
+    os.replace(tmp_path, path)
+    return counts
+
+
+def build_derived(conn, data_root, loaded_tables):
+    """
+    Log the loaded tables to the change feed and build the tables the loaders
+    derive from them, with the MySQL code paths; returns {table: rows}
+    """
+    import anomalies
+    import build_insurance_heatmap
+    import district_facts
+    from change_feed import CHANGES_TABLE_SQL, log_change
+
+    cursor = conn.cursor()
+    cursor.execute(CHANGES_TABLE_SQL)
+    for table in loaded_tables:
+        log_change(cursor, "standin", table)
+    conn.commit()
+
+    district_facts.build_district_facts(conn, data_root)
+    log_change(cursor, "standin", district_facts.TABLE)
+    conn.commit()
+    anomalies.refresh_anomalies(conn)
+    build_insurance_heatmap.build_heatmap(conn, data_root)
+
+    counts = {}
+    for table in [district_facts.TABLE, "anomalies", "insurance_heatmap_bins", "insurance_heatmap_meta"]:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the SQLite stand-in for the phone_pe database")
+    parser.add_argument("--output", default=STANDIN_PATH, help="SQLite file to write")
+    parser.add_argument("--data-root", default=DATA_ROOT, help="path to the PhonePe Pulse data/ directory")
+    args = parser.parse_args()
+
+    for table, count in build_standin(args.output, args.data_root).items():
+        print(f"{table}: {count} rows")
+    print(f"Stand-in database written to {args.output}")
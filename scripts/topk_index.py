@@ -0,0 +1,194 @@
+"""
+Precomputed top-K rankings for every (level, metric, period).
+- One rollup query per source table loads (entity, year, quarter, metrics...)
+- Quarter rollups are summed into per-year and all-time rollups in Python
+- heapq.nlargest keeps the K best entities per metric and period
+- The index is saved as one JSON file and served from memory by the dashboard
+
+Levels: state, district, pincode, device_brand
+Periods: "all", "<year>", "<year>-Q<quarter>"
+
+The loaders rebuild it after every load (see ingest_common.py); by hand:
+    python topk_index.py --k 50
+"""
+import os
+import json
+import time
+import heapq
+import argparse
+from collections import defaultdict
+
+from change_feed import tables_in
+from district_facts import DISTRICT_LABELS_SQL
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                          "Streamlit_Dashboard", "cache", "topk_index.json")
+
+# (level, fields, SQL returning entity, year, quarter, <fields...>)
+# map_users stores only the district name (in its `state` column, see load_map_user.py),
+# and names such as Aurangabad recur across states, so district user lists read
+# district_facts, keyed by state and district.
+ROLLUPS = [
+    ("state", ["transaction_count", "transaction_amount"],
+     "SELECT state, year, quarter, SUM(transaction_count), SUM(transaction_amount) "
+     "FROM aggregated_transactions GROUP BY state, year, quarter"),
+    ("district", ["transaction_count", "transaction_amount"],
+     "SELECT CONCAT(state, ' / ', district), year, quarter, SUM(transaction_count), SUM(transaction_amount) "
+     "FROM map_transactions GROUP BY state, district, year, quarter"),
+    ("pincode", ["transaction_count", "transaction_amount"],
+     "SELECT state_or_district_or_pincode, year, quarter, SUM(transaction_count), SUM(transaction_amount) "
+     "FROM top_transactions GROUP BY state_or_district_or_pincode, year, quarter"),
+    ("district", ["registered_users", "app_opens"],
+     "SELECT n.label, f.year, f.quarter, f.registered_users, f.app_opens "
+     f"FROM district_facts f JOIN {DISTRICT_LABELS_SQL} n ON n.district_key = f.district_key "
+     "WHERE f.registered_users IS NOT NULL"),
+    ("pincode", ["registered_users"],
+     "SELECT state_or_district_or_pincode, year, quarter, SUM(registered_users) "
+     "FROM top_users GROUP BY state_or_district_or_pincode, year, quarter"),
+    ("state", ["insurance_count", "insurance_amount"],
+     "SELECT state, year, quarter, SUM(insurance_count), SUM(insurance_amount) "
+     "FROM aggregated_insurances GROUP BY state, year, quarter"),
+    ("district", ["insurance_count", "insurance_amount"],
+     "SELECT CONCAT(state, ' / ', district), year, quarter, SUM(insurance_count), SUM(insurance_amount) "
+     "FROM map_insurances GROUP BY state, district, year, quarter"),
+    ("pincode", ["insurance_count", "insurance_amount"],
+     "SELECT state_or_district_or_pincode, year, quarter, SUM(insurance_count), SUM(insurance_amount) "
+     "FROM top_insurances GROUP BY state_or_district_or_pincode, year, quarter"),
+    ("device_brand", ["device_count"],
+     "SELECT device_brand, year, quarter, SUM(device_count) "
+     "FROM aggregated_users GROUP BY device_brand, year, quarter"),
+]
+
+
+def period_key(year=None, quarter=None):
+    """'all', '2023' or '2023-Q4'"""
+    if year is None:
+        return "all"
+    if quarter is None:
+        return str(int(year))
+    return f"{int(year)}-Q{int(quarter)}"
+
+
+def list_key(level, metric, period):
+    return f"{level}|{metric}|{period}"
+
+
+def source_table(level, metric):
+    """Table a (level, metric) list is computed from, or None"""
+    for rollup_level, fields, sql in ROLLUPS:
+        if rollup_level == level and metric in fields:
+            return tables_in(sql)[0]
+    return None
+
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+def rollup_periods(rows, n_fields):
+    """
+    Turn (entity, year, quarter, *values) rows into
+    {period_key: {entity: [values...]}} for quarters, years and all time.
+    """
+    periods = defaultdict(lambda: defaultdict(lambda: [0.0] * n_fields))
+    for row in rows:
+        entity, year, quarter = row[0], row[1], row[2]
+        if entity is None or year is None:
+            continue
+        values = [float(v or 0) for v in row[3:]]
+        for key in (period_key(year, quarter), period_key(year), period_key()):
+            totals = periods[key][entity]
+            for i, v in enumerate(values):
+                totals[i] += v
+    return periods
+
+
+def select_top(rollup, fields, k):
+    """Heap-select the k best entities for every metric; rows carry all fields"""
+    lists = {}
+    for i, metric in enumerate(fields):
+        best = heapq.nlargest(k, rollup.items(), key=lambda item: item[1][i])
+        lists[metric] = [[entity] + values for entity, values in best]
+    return lists
+
+
+def build_index(conn, k=50):
+    """Run every rollup query once and return the index as a plain dict"""
+    index = {"built_at": time.strftime("%Y-%m-%d %H:%M:%S"), "k": k, "lists": {}}
+    cursor = conn.cursor()
+    for level, fields, sql in ROLLUPS:
+        try:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Skipping {level} {fields}: {e}")
+            continue
+        for period, rollup in rollup_periods(rows, len(fields)).items():
+            for metric, top_rows in select_top(rollup, fields, k).items():
+                index["lists"][list_key(level, metric, period)] = {"fields": fields, "rows": top_rows}
+    cursor.close()
+    return index
+
+
+def save_index(index, path=INDEX_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, path)  # Readers never see a half-written file
+
+
+def refresh_index(conn, k=50, path=INDEX_PATH):
+    """Rebuild and save the index; failures only print (the dashboard falls back to SQL)"""
+    try:
+        save_index(build_index(conn, k), path)
+    except Exception as e:
+        print(f"Could not refresh the top-K index: {e}")
+
+
+# ==============================================================================
+# LOOKUP
+# ==============================================================================
+class TopKIndex:
+    """In-memory top-K lists; lookups are a dict access plus a slice"""
+
+    def __init__(self, index):
+        self.k = index.get("k")
+        self.built_at = index.get("built_at")
+        self.lists = index.get("lists", {})
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Load a saved index; None if it has not been built"""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def has(self, level, metric, year=None, quarter=None):
+        return list_key(level, metric, period_key(year, quarter)) in self.lists
+
+    def top(self, level, metric, year=None, quarter=None, n=10):
+        """
+        Return (fields, rows) for the n best entities; each row is
+        [entity, value of fields[0], value of fields[1], ...].
+        Returns (None, []) when the list is not in the index.
+        """
+        entry = self.lists.get(list_key(level, metric, period_key(year, quarter)))
+        if entry is None:
+            return None, []
+        return entry["fields"], entry["rows"][:n]
+
+
+if __name__ == "__main__":
+    from ingest_common import connect
+
+    parser = argparse.ArgumentParser(description="Build the top-K ranking index")
+    parser.add_argument("--k", type=int, default=50, help="entities kept per list (default: 50)")
+    parser.add_argument("--output", default=INDEX_PATH, help="where to write the index")
+    args = parser.parse_args()
+
+    conn = connect()
+    index = build_index(conn, args.k)
+    conn.close()
+    save_index(index, args.output)
+    print(f"Top-K index with {len(index['lists'])} lists written to {args.output}")
@@ -0,0 +1,206 @@
+"""
+Data-quality checks that run inside the ingestion stream, on the rows of one
+file (partition = dataset/state/year/quarter) right after it is parsed.
+- year and quarter must be in range; files outside it are not loaded
+- natural keys must be unique within the partition; later duplicates are dropped
+- the same partition must not be loaded twice in one run (e.g. duplicate archive
+  members). The loaders detect this from their set of committed files, so a file
+  whose write was rolled back still counts as not loaded, and report it here
+- district sums (map_* files) must reconcile with the state totals (aggregated_* files)
+- files that produce no rows are reported
+
+Memory stays bounded: duplicate keys are tracked per partition only, and a
+partition's totals are kept just until its counterpart arrives. Totals are also
+saved to ingest_partition_totals, so loaders run one at a time still reconcile
+against the other side of an earlier run.
+
+Violations are counted per (dataset, check) with a few examples each.
+"""
+import json
+import time
+from collections import Counter, defaultdict
+
+MIN_YEAR = 2018  # first year published by PhonePe Pulse
+MAX_SAMPLES = 5  # examples kept per (dataset, check)
+TOLERANCE = 1e-6  # relative difference allowed when reconciling totals
+
+# Columns (row tuple positions) that identify a row within its partition.
+# The partition itself supplies state, year and quarter.
+NATURAL_KEYS = {
+    "aggregated_transaction": (3,),      # transaction_type
+    "aggregated_insurance": (),          # one row per file
+    "aggregated_user": (5,),             # device_brand
+    "map_transaction": (3,),             # district
+    "map_insurance": (3,),               # district
+    "map_user": (2,),                    # district (stored in `state`)
+    "top_transaction": (2,),             # pincode
+    "top_insurance": (2,),               # pincode
+    "top_user": (2,),                    # pincode
+}
+
+
+def _sum(*cols):
+    return lambda rows: tuple(float(sum(r[c] or 0 for r in rows)) for c in cols)
+
+
+def _first(*cols):
+    # aggregated_users repeats the state totals on every device row
+    return lambda rows: tuple(float(rows[0][c] or 0) for c in cols)
+
+
+# dataset -> (group, side, totals function). Both sides of a group cover the same partitions.
+RECONCILE = {
+    "aggregated_transaction": ("transactions", "state", _sum(4, 5)),
+    "map_transaction": ("transactions", "district", _sum(4, 5)),
+    "aggregated_insurance": ("insurance", "state", _sum(3, 4)),
+    "map_insurance": ("insurance", "district", _sum(4, 5)),
+    "aggregated_user": ("users", "state", _first(3, 4)),
+    "map_user": ("users", "district", _sum(3, 4)),
+}
+
+TOTALS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ingest_partition_totals (
+        loader VARCHAR(50) NOT NULL,
+        state VARCHAR(100) NOT NULL,
+        year INT NOT NULL,
+        quarter INT NOT NULL,
+        value_1 DOUBLE DEFAULT NULL,
+        value_2 DOUBLE DEFAULT NULL,
+        PRIMARY KEY (loader, state, year, quarter)
+    )
+"""
+
+LOAD_TOTALS_SQL = "SELECT state, year, quarter, value_1, value_2 FROM ingest_partition_totals WHERE loader = %s"
+
+CLEAR_TOTALS_SQL = "DELETE FROM ingest_partition_totals WHERE loader = %s"
+
+SAVE_TOTALS_SQL = """
+    REPLACE INTO ingest_partition_totals (loader, state, year, quarter, value_1, value_2)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def counterpart(name):
+    """The dataset on the other side of a reconciliation group, or None"""
+    if name not in RECONCILE:
+        return None
+    group, side, _ = RECONCILE[name]
+    for other, (other_group, other_side, _) in RECONCILE.items():
+        if other_group == group and other_side != side:
+            return other
+    return None
+
+
+def seed_datasets(names):
+    """Counterparts whose totals must come from the table because they are not loaded in this run"""
+    return sorted({counterpart(n) for n in names} - set(names) - {None})
+
+
+class StreamValidator:
+    """Validates each file's rows as they stream past; see the module docstring"""
+
+    def __init__(self, max_year=None):
+        self.max_year = max_year or time.localtime().tm_year
+        self.counts = Counter()               # (dataset, check) -> violations
+        self.samples = defaultdict(list)      # (dataset, check) -> first MAX_SAMPLES messages
+        self.pending = {}                     # (group, state, year, quarter) -> (side, dataset, totals)
+        self.files = 0
+        self.reconciled = 0
+
+    def _flag(self, dataset, check, message):
+        key = (dataset, check)
+        self.counts[key] += 1
+        if len(self.samples[key]) < MAX_SAMPLES:
+            self.samples[key].append(message)
+
+    def seed(self, dataset, totals_rows):
+        """Add totals saved by an earlier run: (state, year, quarter, value_1, value_2) rows"""
+        group, side, _ = RECONCILE[dataset]
+        for state, year, quarter, *values in totals_rows:
+            self.pending[(group, state, int(year), int(quarter))] = (side, dataset, tuple(values))
+
+    def duplicate_partition(self, dataset, rel_path):
+        """Report a file whose partition was already loaded in this run (found by the loader)"""
+        self.files += 1
+        self._flag(dataset, "duplicate_partition", rel_path)
+
+    def check(self, dataset, state, year, quarter, rel_path, rows):
+        """
+        Validate the rows of one file.
+        Returns (rows to insert, totals row for ingest_partition_totals or None).
+        """
+        self.files += 1
+
+        if not MIN_YEAR <= year <= self.max_year:
+            self._flag(dataset, "year_range", f"{rel_path}: year {year}")
+            return [], None
+        if not 1 <= quarter <= 4:
+            self._flag(dataset, "quarter_range", f"{rel_path}: quarter {quarter}")
+            return [], None
+
+        if not rows:
+            self._flag(dataset, "empty_partition", rel_path)
+            return rows, None
+
+        key_cols = NATURAL_KEYS.get(dataset)
+        if key_cols is not None:
+            keys = set()  # lives only for this partition
+            unique_rows = []
+            for row in rows:
+                key = tuple(row[c] for c in key_cols)
+                if key in keys:
+                    self._flag(dataset, "duplicate_key", f"{rel_path}: {key}")
+                    continue
+                keys.add(key)
+                unique_rows.append(row)
+            rows = unique_rows
+
+        if dataset not in RECONCILE:
+            return rows, None
+        group, side, totals_of = RECONCILE[dataset]
+        totals = totals_of(rows)
+        self._reconcile(group, side, dataset, state, year, quarter, totals)
+        return rows, (dataset, state, year, quarter) + totals
+
+    def _reconcile(self, group, side, dataset, state, year, quarter, totals):
+        key = (group, state, year, quarter)
+        other = self.pending.get(key)
+        if other is None or other[0] == side:
+            self.pending[key] = (side, dataset, totals)
+            return
+        del self.pending[key]  # both sides seen: nothing left to keep for this partition
+        self.reconciled += 1
+        for ours, theirs in zip(totals, other[2]):
+            if theirs is None or abs(ours - theirs) > TOLERANCE * max(abs(ours), abs(theirs), 1.0):
+                self._flag(dataset, "reconcile",
+                           f"{state}/{year}/Q{quarter}: {dataset}={totals} vs {other[1]}={other[2]}")
+                return
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+    def report(self):
+        """Violations as a plain dict (JSON-serialisable)"""
+        return {
+            "files": self.files,
+            "reconciled_partitions": self.reconciled,
+            "unmatched_partitions": len(self.pending),
+            "violations": [
+                {"dataset": dataset, "check": check, "count": count,
+                 "samples": self.samples[(dataset, check)]}
+                for (dataset, check), count in sorted(self.counts.items())
+            ],
+        }
+
+    def print_report(self):
+        total = sum(self.counts.values())
+        print(f"Validation: {self.files} files, {self.reconciled} partitions reconciled, "
+              f"{total} violations")
+        for (dataset, check), count in sorted(self.counts.items()):
+            print(f"  {dataset:<24} {check:<20} {count}")
+            for sample in self.samples[(dataset, check)][:2]:
+                print(f"      e.g. {sample}")
+
+    def save_report(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)